@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+from playwright.async_api import async_playwright
+
+from browser_setup import CONTEXT_OPTIONS, prepare_page_async
+from sources import search_url, iter_cards_async, capture_responses
+from page_readiness import CAPTCHA_SOLVE_TIMEOUT
+
+# Pages open at once across all sources
+CRAWL_CONCURRENCY = 4
+# Per-site caps so no single source sees more than this many parallel pages
+SOURCE_CONCURRENCY = {
+    'Realtor.com': 1,
+    'ForSaleByOwner': 2,
+    'Homes.com': 2,
+}
+
+
+async def hand_off(finder, card, source, city):
+    """
+    Runs finder.process_card on a worker thread. It ends in GeocodeWorker.submit,
+    which blocks while the geocode queue is full; awaiting it here applies that
+    backpressure to this job only instead of freezing every page on the loop.
+    """
+    await asyncio.to_thread(finder.process_card, card, source, city)
+
+
+async def scrape_realtor(finder, page, city):
+    print(f"--- Scraping Realtor.com for {city} ---")
+    try:
+        with capture_responses(page, "Realtor.com") as capture:
+            await page.goto(search_url("Realtor.com", city), timeout=90000, wait_until='domcontentloaded')
+            content = await page.content()
+            if "unblockrequest" in content or "captcha" in content.lower():
+                print(f"⚠ DETECTED BLOCK/CAPTCHA on Realtor.com ({city}).")
+                await finder.readiness.wait_async(page, "Realtor.com", city, timeout=CAPTCHA_SOLVE_TIMEOUT)
+
+            async def settle(page):
+                if not await finder.readiness.wait_async(page, "Realtor.com", city):
+                    print(f"Timed out waiting for property-card in {city}.")
+            await settle(page)
+
+            found = 0
+            async for card in iter_cards_async(page, "Realtor.com", city, settle, capture=capture):
+                found += 1
+                await hand_off(finder, card, "Realtor.com", city)
+            print(f"Found {found} cards on Realtor in {city}")
+    except Exception as e:
+        print(f"Realtor scrape error ({city}): {e}")
+
+
+async def scrape_fsbo(finder, page, city):
+    print(f"--- Scraping ForSaleByOwner.com for {city} ---")
+    try:
+        with capture_responses(page, "ForSaleByOwner") as capture:
+            await page.goto(search_url("ForSaleByOwner", city), timeout=60000, wait_until='domcontentloaded')
+            settle = lambda page: finder.readiness.wait_async(page, "ForSaleByOwner", city)
+            await settle(page)
+
+            found = 0
+            async for card in iter_cards_async(page, "ForSaleByOwner", city, settle, capture=capture):
+                found += 1
+                await hand_off(finder, card, "ForSaleByOwner", city)
+            print(f"Found {found} cards on FSBO in {city}")
+    except Exception as e:
+        print(f"FSBO scrape error ({city}): {e}")
+
+
+async def scrape_homes_com(finder, page, city):
+    print(f"--- Scraping Homes.com for {city} ---")
+    try:
+        with capture_responses(page, "Homes.com") as capture:
+            await page.goto(search_url("Homes.com", city), timeout=60000, wait_until='domcontentloaded')
+            settle = lambda page: finder.readiness.wait_async(page, "Homes.com", city)
+            await settle(page)
+
+            found = 0
+            async for card in iter_cards_async(page, "Homes.com", city, settle, capture=capture):
+                found += 1
+                await hand_off(finder, card, "Homes.com", city)
+            print(f"Found {found} cards on Homes.com in {city}")
+    except Exception as e:
+        print(f"Homes.com scrape error ({city}): {e}")
+
+
+SCRAPERS = {
+    'Realtor.com': scrape_realtor,
+    'ForSaleByOwner': scrape_fsbo,
+    'Homes.com': scrape_homes_com,
+}
+
+
+class AsyncCrawler:
+    """
+    Crawls every (city, source) pair concurrently on one browser.
+
+    Each job gets its own browser context so cookies and storage don't leak
+    between sites. At most `concurrency` pages are open at once, and no source
+    gets more than its SOURCE_CONCURRENCY cap. Cards go to finder.process_listing,
+    the same listing store the sequential crawl uses.
+    """
+
+    def __init__(self, finder, concurrency=CRAWL_CONCURRENCY, source_limits=None):
+        self.finder = finder
+        self.concurrency = concurrency
+        self.source_limits = source_limits or SOURCE_CONCURRENCY
+
+    def crawl(self, pairs):
+        """Crawls each (city, source) in `pairs`."""
+        start = time.monotonic()
+        asyncio.run(self._crawl(pairs))
+        print(f"Concurrent crawl of {len(pairs)} city/source pairs took {time.monotonic() - start:.1f}s")
+
+    async def _crawl(self, pairs):
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self.source_slots = {s: asyncio.Semaphore(self.source_limits.get(s, 1)) for _, s in pairs}
+        async with async_playwright() as p:
+            # HEADLESS=False is crucial for Realtor.com
+            browser = await p.chromium.launch(headless=False)
+            jobs = [self._run_job(browser, source, city) for city, source in pairs]
+            await asyncio.gather(*jobs)
+            await browser.close()
+
+    async def _run_job(self, browser, source, city):
+        # Take the per-source slot first so a throttled source doesn't hold a global slot while it waits
+        async with self.source_slots[source], self.slots:
+            started = time.monotonic()
+            context = await browser.new_context(**CONTEXT_OPTIONS)
+            try:
+                await self.finder.network_policy.install_async(context)
+                page = await context.new_page()
+                await prepare_page_async(page)
+                await SCRAPERS[source](self.finder, page, city)
+            except Exception as e:
+                print(f"{source} job for {city} failed: {e}")
+            finally:
+                await context.close()
+                self.finder.readiness.record_job(city, source, time.monotonic() - started)
@@ -0,0 +1,116 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import dispatcher
+from dispatcher import Dispatcher
+
+RECIPIENTS_PER_PROVIDER = 20
+MESSAGES_PER_RECIPIENT = 3
+STUB_LATENCY_SECONDS = 0.05
+# Share of stub responses that are 503 / 429, to exercise the retry path
+STUB_ERROR_RATE = 0.05
+STUB_THROTTLE_RATE = 0.02
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers like TextMeBot, CallMeBot and Telegram, after STUB_LATENCY_SECONDS."""
+
+    protocol_version = 'HTTP/1.1' # Keep-alive, like the real APIs
+    connections = set()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, headers=None):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self):
+        with StubHandler.lock:
+            StubHandler.connections.add(self.client_address)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(STUB_LATENCY_SECONDS)
+        roll = random.random()
+        if roll < STUB_ERROR_RATE:
+            self._reply(503, "busy")
+        elif roll < STUB_ERROR_RATE + STUB_THROTTLE_RATE:
+            self._reply(429, "slow down", {'Retry-After': '0'})
+        elif self.path.startswith('/bot'):
+            self._reply(200, json.dumps({'ok': True}))
+        else:
+            self._reply(200, "Success")
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+def channels():
+    return [{'provider': provider, 'target': f"+1555{i:04d}", 'apikey': "key"}
+            for provider in dispatcher.PROVIDER_URLS for i in range(RECIPIENTS_PER_PROVIDER)]
+
+
+def one_off(base, channel, text):
+    """What the *_interface modules do: a fresh connection per message and no retries."""
+    if channel['provider'] == 'telegram':
+        response = requests.post(f"{base}/bot{channel['apikey']}/sendMessage",
+                                 json={'chat_id': channel['target'], 'text': text}, timeout=20)
+    else:
+        path = "/send.php" if channel['provider'] == 'textmebot' else "/whatsapp.php"
+        response = requests.get(f"{base}{path}", params={'recipient': channel['target'], 'text': text}, timeout=20)
+    return response.status_code == 200
+
+
+def run(label, send_everything):
+    StubHandler.connections.clear()
+    start = time.perf_counter()
+    delivered, total = send_everything()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:>7.2f} s  {delivered}/{total} delivered  {len(StubHandler.connections)} connections")
+
+
+def bench():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    targets = channels()
+    texts = [f"({i + 1}/{MESSAGES_PER_RECIPIENT}) " + "🏠 listing digest\n" * 40 for i in range(MESSAGES_PER_RECIPIENT)]
+    total = len(targets) * len(texts)
+    print(f"{len(targets)} recipients x {len(texts)} messages, stub latency {STUB_LATENCY_SECONDS * 1000:.0f} ms, "
+          f"{(STUB_ERROR_RATE + STUB_THROTTLE_RATE) * 100:.0f}% transient errors")
+
+    def sequential():
+        return sum(one_off(base, c, text) for c in targets for text in texts), total
+
+    run("one-off, sequential", sequential)
+
+    dispatcher.BACKOFF_BASE_SECONDS = 0.05 # Keep the stub's retries from dominating the timing
+    pool = Dispatcher(base_urls={provider: base for provider in dispatcher.PROVIDER_URLS},
+                      rates={provider: 0 for provider in dispatcher.PROVIDER_URLS})
+
+    def pooled():
+        def to_one(channel):
+            return sum(pool.send(channel, text) for text in texts)
+        return sum(pool.pool.map(to_one, targets)), total
+
+    run("dispatcher, pooled", pooled)
+    pool.close()
+    print(pool.report.summary())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,42 @@
+import sys
+import time
+
+import html_parsers
+
+SAVED_PAGES = [('ForSaleByOwner', 'debug_fsbo.html')]
+# DOM card parsing and embedded JSON are timed separately; 'auto' would only ever take the JSON path on pages that have it
+MODES = ['dom', 'structured']
+ROUNDS = 50
+
+
+def bench(rounds=ROUNDS):
+    """
+    Offline extraction throughput on saved result pages, per extraction mode
+    and HTML parser backend. Also checks that every backend returns identical
+    records in each mode.
+    """
+    backends = [html_parsers.SoupBackend]
+    if html_parsers.HAS_SELECTOLAX:
+        backends.insert(0, html_parsers.LexborBackend)
+    else:
+        print("selectolax not installed, benchmarking BeautifulSoup only.")
+
+    for source, path in SAVED_PAGES:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        print(f"{path} ({len(html) // 1024} KB, {source})")
+        for mode in MODES:
+            results = []
+            for backend in backends:
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    records = html_parsers.parse_html(source, html, backend=backend, mode=mode)
+                elapsed = time.perf_counter() - start
+                results.append(records)
+                print(f"  {mode:>10} {backend.name:>12}: {rounds / elapsed:8.1f} pages/s, {len(records)} records/page")
+            assert results[0], f"{mode} extraction found no records in {path}"
+            assert all(r == results[0] for r in results), f"parser backends disagree in {mode} mode"
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else ROUNDS)
@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+
+from masjid_index import MasjidMatcher, GridIndex, GRID_MIN_CATALOG
+from find_houses import SEARCH_RADIUS_MILES
+
+# The smallest catalog covers a box this size around Phoenix; larger catalogs get a
+# proportionally larger box, so masjids per square mile stay the same at every size
+CENTER = (33.45, -112.07)
+BASE_CATALOG_SIZE = 100
+BASE_HALF_SIDE_DEG = 0.5
+CATALOG_SIZES = [100, 300, 1000, 10000, 100000]
+QUERY_COUNT = 10000
+# Listings matched one at a time with their nearest masjid, as HouseFinder.match_listing does
+SINGLE_QUERY_COUNT = 1000
+
+
+def bounding_box(size):
+    half = BASE_HALF_SIDE_DEG * (size / BASE_CATALOG_SIZE) ** 0.5
+    return (CENTER[0] - half, CENTER[0] + half), (CENTER[1] - half, CENTER[1] + half)
+
+
+def random_points(rng, n, box):
+    lat_range, lon_range = box
+    return rng.uniform(*lat_range, n), rng.uniform(*lon_range, n)
+
+
+def candidates_per_query(matcher, lats, lons):
+    """Masjids the grid hands to the distance check, averaged over the queries."""
+    queries, _ = matcher.grid.pairs(lats, lons, matcher.radius)
+    return len(queries) / len(lats)
+
+
+def time_match(matcher, lats, lons):
+    start = time.perf_counter()
+    nearby, _ = matcher.match(lats, lons, with_nearest=False)
+    return time.perf_counter() - start, sum(len(n) for n in nearby)
+
+
+def time_match_one(matcher, lats, lons):
+    start = time.perf_counter()
+    nearest = [matcher.match_one(lat, lon)[1] for lat, lon in zip(lats.tolist(), lons.tolist())]
+    return time.perf_counter() - start, np.array(nearest)
+
+
+def bench():
+    """
+    Radius-query cost against growing masjid catalogs, grid index vs full scan,
+    for a batch of listings and for listings matched one at a time with their
+    nearest masjid. The catalog's area grows with it, so density is held
+    constant: with the grid, candidates scanned and cost per query should stay
+    roughly flat. MasjidMatcher only uses the grid from GRID_MIN_CATALOG masjids.
+    """
+    rng = np.random.default_rng(42)
+    print(f"{QUERY_COUNT} radius queries ({SEARCH_RADIUS_MILES} mi), "
+          f"{BASE_CATALOG_SIZE / (2 * BASE_HALF_SIDE_DEG) ** 2:.0f} masjids per square degree")
+    print(f"{'masjids':>10} {'grid us/query':>14} {'scan us/query':>14} {'candidates/query':>17} {'matches':>8} "
+          f"{'grid us/single':>15} {'scan us/single':>15}")
+
+    for size in CATALOG_SIZES:
+        box = bounding_box(size)
+        q_lats, q_lons = random_points(rng, QUERY_COUNT, box)
+        m_lats, m_lons = random_points(rng, size, box)
+        masjids = [{'name': f"M{i}", 'lat': a, 'lon': b} for i, (a, b) in enumerate(zip(m_lats, m_lons))]
+        gridded = MasjidMatcher(masjids, SEARCH_RADIUS_MILES)
+        gridded.grid = GridIndex(gridded.lats, gridded.lons, SEARCH_RADIUS_MILES)
+        scanned = MasjidMatcher(masjids, SEARCH_RADIUS_MILES)
+        scanned.grid = None
+
+        grid_time, grid_hits = time_match(gridded, q_lats, q_lons)
+        scan_time, scan_hits = time_match(scanned, q_lats, q_lons)
+        assert grid_hits == scan_hits, f"grid found {grid_hits} matches, full scan {scan_hits}"
+        candidates = candidates_per_query(gridded, q_lats, q_lons)
+
+        one_lats, one_lons = q_lats[:SINGLE_QUERY_COUNT], q_lons[:SINGLE_QUERY_COUNT]
+        grid_one, grid_nearest = time_match_one(gridded, one_lats, one_lons)
+        scan_one, scan_nearest = time_match_one(scanned, one_lats, one_lons)
+        assert np.allclose(grid_nearest, scan_nearest), "grid and full scan disagree on the nearest masjid"
+        print(f"{size:>10} {grid_time / QUERY_COUNT * 1e6:>14.2f} {scan_time / QUERY_COUNT * 1e6:>14.2f} "
+              f"{candidates:>17.1f} {grid_hits:>8} "
+              f"{grid_one / SINGLE_QUERY_COUNT * 1e6:>15.1f} {scan_one / SINGLE_QUERY_COUNT * 1e6:>15.1f}")
+    print(f"MasjidMatcher uses the grid from {GRID_MIN_CATALOG} masjids")
+
+
+if __name__ == "__main__":
+    bench()
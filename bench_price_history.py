@@ -0,0 +1,64 @@
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import price_history
+from price_history import PriceHistory
+
+LISTING_COUNT = 50000
+RUN_COUNT = 60 # One observation per listing per run: 3M rows
+RUN_SECONDS = 12 * 3600
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<34} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+    return result
+
+
+def bench():
+    """
+    Builds a history of LISTING_COUNT listings observed over RUN_COUNT runs,
+    with occasional price cuts and delistings, then times the queries.
+    """
+    rng = np.random.default_rng(7)
+    path = tempfile.mkdtemp(prefix="price_history_")
+    try:
+        history = PriceHistory(path)
+        links = [f"https://example.com/listing/{i}" for i in range(LISTING_COUNT)]
+        prices = rng.integers(250, 900, LISTING_COUNT) * 1000
+        start = int(time.time()) - RUN_COUNT * RUN_SECONDS
+        record_seconds = save_seconds = 0.0
+        for run in range(RUN_COUNT):
+            ts = start + run * RUN_SECONDS
+            prices = np.where(rng.random(LISTING_COUNT) < 0.02, prices - 5000, prices)
+            live = rng.random(LISTING_COUNT) > 0.01
+            t0 = time.perf_counter()
+            for link, price, is_live in zip(links, prices, live):
+                if is_live:
+                    history.record(link, f"${price:,}", ts=ts)
+                else:
+                    history.mark_gone(link, ts=ts)
+            t1 = time.perf_counter()
+            history.save()
+            record_seconds += t1 - t0
+            save_seconds += time.perf_counter() - t1
+
+        print(f"{LISTING_COUNT} listings x {RUN_COUNT} runs "
+              f"(chunks merged above {price_history.MAX_CHUNKS})")
+        print(f"{'record, per run':<34} {record_seconds / RUN_COUNT * 1000:>9.1f} ms")
+        print(f"{'save, per run':<34} {save_seconds / RUN_COUNT * 1000:>9.1f} ms")
+        fresh = PriceHistory(path)
+        ids, _, _, _ = timed("load columns", fresh.columns)
+        changes = timed("price changes, last 7 days", lambda: fresh.price_changes(7))
+        on_market = timed("days on market, all listings", fresh.days_on_market)
+        print(f"{len(ids)} observations, {len(changes)} recent changes, {len(on_market)} listings")
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from render import render_file, render_site
+
+LISTING_COUNTS = [10000, 100000]
+MASJID_COUNT = 12
+MATCHES_PER_LISTING = 2
+
+
+def fake_data(rng, n):
+    masjids = [{'name': f"Masjid {i}", 'lat': 33.5, 'lon': -112.0} for i in range(MASJID_COUNT)]
+    listings = []
+    for i in range(n):
+        picks = rng.choice(MASJID_COUNT, MATCHES_PER_LISTING, replace=False)
+        listings.append({
+            'address': f"{i} N {i % 99}th Ave, Phoenix, AZ 850{i % 90:02d}",
+            'price': f"${rng.integers(250, 900) * 1000:,}",
+            'link': f"https://www.homes.com/property/{i}/",
+            'image': f"https://images.example.com/{i}.jpg",
+            'source': "Homes.com",
+            'city': "Phoenix",
+            'nearby_masjids': [{'name': f"Masjid {m}", 'distance': float(rng.uniform(0, 5))} for m in picks],
+        })
+    return listings, masjids
+
+
+def measure(render):
+    start = time.perf_counter()
+    render()
+    elapsed = time.perf_counter() - start
+    # Second pass under tracemalloc, which slows rendering down too much to time it
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def sizes(out_dir, suffix):
+    found = [os.path.getsize(os.path.join(d, name)) for d, _, names in os.walk(out_dir) for name in names
+             if name.endswith(suffix)]
+    return sum(found), max(found, default=0)
+
+
+def bench():
+    """
+    Render time and peak Python heap for the single inline page (render_file)
+    and the data-driven site (render_site), plus what a browser downloads:
+    the largest HTML document and the JSON behind a masjid page.
+    """
+    rng = np.random.default_rng(3)
+    print(f"{'listings':>10} {'mode':>7} {'render s':>9} {'peak MB':>8} {'largest HTML KB':>16} {'largest JSON KB':>16}")
+    for n in LISTING_COUNTS:
+        listings, masjids = fake_data(rng, n)
+        out_dir = tempfile.mkdtemp(prefix="render_")
+        try:
+            path = os.path.join(out_dir, "inline.html")
+            elapsed, peak = measure(lambda: render_file(path, listings, masjids, "Bench", "empty", secure=True))
+            print(f"{n:>10} {'inline':>7} {elapsed:>9.2f} {peak / 1e6:>8.1f} {os.path.getsize(path) / 1e3:>16.0f} {'-':>16}")
+            os.remove(path)
+
+            # Remove the manifest between passes so both are full renders
+            manifest = os.path.join(out_dir, "render_manifest.json")
+            def site():
+                if os.path.exists(manifest):
+                    os.remove(manifest)
+                render_site(listings, masjids, "Bench", "empty", secure=True, out_dir=out_dir)
+            elapsed, peak = measure(site)
+            _, html_max = sizes(out_dir, ".html")
+            _, json_max = sizes(out_dir, ".json")
+            print(f"{n:>10} {'site':>7} {elapsed:>9.2f} {peak / 1e6:>8.1f} {html_max / 1e3:>16.0f} {json_max / 1e3:>16.0f}")
+        finally:
+            shutil.rmtree(out_dir)
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import os
+import socket
+import sys
+from contextlib import contextmanager
+
+from browser_setup import CONTEXT_OPTIONS, prepare_page, prepare_context_async
+
+# host:port the service takes lease requests on
+BROWSER_SERVICE_ADDRESS = '127.0.0.1:9333'
+# Runs attach to the service only when BROWSER_SERVICE names it (e.g. BROWSER_SERVICE=127.0.0.1:9333);
+# the CDP attach hasn't been checked against a real Chromium yet, so launching locally stays the default
+BROWSER_SERVICE = os.getenv('BROWSER_SERVICE', '0')
+# Chrome DevTools Protocol port runs attach to
+CDP_PORT = 9222
+BROWSER_POOL_SIZE = 3
+# A context is replaced by a fresh one once its pages have navigated this often
+CONTEXT_MAX_NAVIGATIONS = 200
+LEASE_CONNECT_TIMEOUT = 2
+
+
+def _anchor_url(context_id):
+    return f"about:blank#pool-{context_id}"
+
+
+class PooledContext:
+    def __init__(self, context_id, context, anchor):
+        self.id = context_id
+        self.context = context
+        self.anchor = anchor # Idle tab that keeps the context alive and lets clients find it
+        self.browser_context_id = None # Chromium's id for the context, which clients open their tabs in
+        self.navigations = 0
+        self.leases = 0
+
+
+class BrowserService:
+    """
+    Long-running Chromium that scrape runs attach to over CDP instead of
+    launching their own. Keeps a pool of contexts already set up with
+    CONTEXT_OPTIONS and the stealth init scripts, and leases each to one run
+    at a time over a small TCP protocol: the run sends one JSON line, gets
+    back the context id and CDP endpoint, and holds the lease for as long as
+    the connection stays open, so a crashed run releases it too. On release
+    the run's tabs are closed; contexts past CONTEXT_MAX_NAVIGATIONS are
+    swapped for fresh ones.
+
+    A client attached over CDP can't use the context's Playwright object (its
+    connection files foreign contexts' pages under the default context), so
+    it opens tabs with Target.createTarget in the granted browserContextId.
+    Those tabs belong to the pooled context: this connection sees them, sets
+    them up with the context's options and init scripts, and counts and
+    closes them like its own.
+    """
+
+    def __init__(self, address=BROWSER_SERVICE_ADDRESS, cdp_port=CDP_PORT, pool_size=BROWSER_POOL_SIZE,
+                 max_navigations=CONTEXT_MAX_NAVIGATIONS, headless=False):
+        host, port = address.rsplit(':', 1)
+        self.host, self.port = host, int(port)
+        self.cdp_port = cdp_port
+        self.pool_size = pool_size
+        self.max_navigations = max_navigations
+        self.headless = headless
+        self.next_id = 0
+        self.leased = 0
+        self.recycled = 0
+
+    async def _new_context(self):
+        self.next_id += 1
+        context = await self.browser.new_context(**CONTEXT_OPTIONS)
+        await prepare_context_async(context)
+        anchor = await context.new_page()
+        await anchor.goto(_anchor_url(self.next_id))
+        entry = PooledContext(self.next_id, context, anchor)
+        cdp = await context.new_cdp_session(anchor)
+        entry.browser_context_id = (await cdp.send('Target.getTargetInfo'))['targetInfo']['browserContextId']
+        await cdp.detach()
+
+        def count(frame):
+            if frame.parent_frame is None and frame.page is not entry.anchor:
+                entry.navigations += 1
+        # The service's own connection sees pages clients open in its contexts
+        context.on('page', lambda page: page.on('framenavigated', count))
+        return entry
+
+    async def _release(self, entry):
+        for page in entry.context.pages:
+            if page is not entry.anchor:
+                await page.close()
+        if entry.navigations >= self.max_navigations:
+            await entry.context.close()
+            entry = await self._new_context()
+            self.recycled += 1
+            print(f"Recycled a browser context after {self.max_navigations} navigations")
+        await self.idle.put(entry)
+
+    async def _handle(self, reader, writer):
+        entry = None
+        try:
+            request = json.loads(await reader.readline() or b'{}')
+            if request.get('op') != 'lease':
+                return
+            entry = await self.idle.get()
+            entry.leases += 1
+            self.leased += 1
+            grant = {'id': entry.id, 'cdp': f"http://127.0.0.1:{self.cdp_port}", 'browser_context_id': entry.browser_context_id}
+            writer.write(json.dumps(grant).encode() + b"\n")
+            await writer.drain()
+            await reader.read() # Held until the client disconnects
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            if entry:
+                await self._release(entry)
+            writer.close()
+
+    async def serve(self):
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            # HEADLESS=False is crucial for Realtor.com
+            self.browser = await p.chromium.launch(headless=self.headless,
+                                                   args=[f"--remote-debugging-port={self.cdp_port}"])
+            self.idle = asyncio.Queue()
+            for _ in range(self.pool_size):
+                await self.idle.put(await self._new_context())
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+            print(f"Browser service ready on {self.host}:{self.port} "
+                  f"({self.pool_size} contexts, CDP on port {self.cdp_port})")
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                print(f"Browser service stopped: {self.leased} leases, {self.recycled} contexts recycled")
+                await self.browser.close()
+
+
+class BrowserLease:
+    """
+    A browser context for one run: leased from the service when it's enabled
+    and running, otherwise launched locally. For a leased context `context` is
+    the CDP connection's default context, where Playwright files the tabs;
+    routes installed on it apply to them.
+    """
+
+    def __init__(self, context, cdp=None, browser_context_id=None):
+        self.context = context
+        self.cdp = cdp
+        self.browser_context_id = browser_context_id
+
+    def new_page(self):
+        if self.browser_context_id is None:
+            page = self.context.new_page()
+            prepare_page(page)
+            return page
+        # context.new_page() would open the tab outside the pooled context, without its options or stealth
+        with self.context.expect_page() as info:
+            self.cdp.send('Target.createTarget', {'url': "about:blank", 'browserContextId': self.browser_context_id})
+        return info.value
+
+
+def _request_lease(address):
+    host, port = address.rsplit(':', 1)
+    sock = socket.create_connection((host, int(port)), timeout=LEASE_CONNECT_TIMEOUT)
+    sock.settimeout(None) # Waiting for a free context can take as long as another run
+    sock.sendall(json.dumps({'op': 'lease'}).encode() + b"\n")
+    reply = sock.makefile('rb').readline()
+    if not reply:
+        sock.close()
+        raise ConnectionError("browser service closed the connection")
+    return sock, json.loads(reply)
+
+
+@contextmanager
+def lease_browser(p, headless=False, slow_mo=0, address=BROWSER_SERVICE):
+    """
+    Yields a BrowserLease from the warm browser service, or from a fresh local
+    launch if BROWSER_SERVICE is unset or the service isn't running. `p` is a
+    sync_playwright() instance.
+    """
+    lease = None
+    if address and address != '0':
+        try:
+            lease = _request_lease(address)
+        except OSError:
+            lease = None
+    if lease is None:
+        browser = p.chromium.launch(headless=headless, slow_mo=slow_mo)
+        try:
+            yield BrowserLease(browser.new_context(**CONTEXT_OPTIONS))
+        finally:
+            browser.close()
+        return
+
+    sock, grant = lease
+    try:
+        browser = p.chromium.connect_over_cdp(grant['cdp'], slow_mo=slow_mo)
+        try:
+            cdp = browser.new_browser_cdp_session()
+            print(f"Attached to warm browser context {grant['id']}")
+            yield BrowserLease(browser.contexts[0], cdp=cdp, browser_context_id=grant['browser_context_id'])
+        finally:
+            browser.close() # Disconnects; the service closes this run's tabs when the lease ends
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    # Usage: python browser_service.py  (keep it running; with BROWSER_SERVICE=127.0.0.1:9333 set,
+    #        find_houses.py and the debug scripts attach to it)
+    sys.stdout.reconfigure(encoding='utf-8')
+    try:
+        asyncio.run(BrowserService().serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,44 @@
+try:
+    from playwright_stealth import stealth_sync, stealth_async
+    HAS_STEALTH = True
+except ImportError:
+    HAS_STEALTH = False
+    print("Notice: playwright-stealth not installed, using manual stealth method.")
+
+# Fixed modern User Agent
+FIXED_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+CONTEXT_OPTIONS = {
+    'user_agent': FIXED_USER_AGENT,
+    'viewport': {'width': 1920, 'height': 1080},
+    'locale': 'en-US',
+    'timezone_id': 'America/Phoenix'
+}
+
+# Manual Stealth: Overwrite webdriver property
+WEBDRIVER_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+"""
+
+
+def prepare_page(page):
+    """Applies stealth patches to a sync Playwright page."""
+    if HAS_STEALTH:
+        stealth_sync(page)
+    page.add_init_script(WEBDRIVER_INIT_SCRIPT)
+
+
+async def prepare_page_async(page):
+    """Applies stealth patches to an async Playwright page."""
+    if HAS_STEALTH:
+        await stealth_async(page)
+    await page.add_init_script(WEBDRIVER_INIT_SCRIPT)
+
+
+async def prepare_context_async(context):
+    """Applies the same patches to every page a context will open, including pages opened by other clients."""
+    if HAS_STEALTH:
+        await stealth_async(context) # Only calls add_init_script, which contexts have too
+    await context.add_init_script(WEBDRIVER_INIT_SCRIPT)
@@ -5,6 +5,7 @@ def send_callmebot_message(phone_number, api_key, message):
     """
     Sends a WhatsApp message using the CallMeBot API.
     This provides a simple, HTTP-based interface without browser automation.
+    Returns True if the API accepted the message.
     """
     encoded_message = urllib.parse.quote(message)
     url = f"https://api.callmebot.com/whatsapp.php?phone={phone_number}&text={encoded_message}&apikey={api_key}"
@@ -15,12 +16,13 @@ def send_callmebot_message(phone_number, api_key, message):
             print("✅ API Request Sent Successfully.")
             if "Error" in response.text:
                  print(f"⚠️ API Response Warning: {response.text}")
-            else:
-                 print("Message delivered to WhatsApp!")
-        else:
-            print(f"❌ API Request Failed: {response.status_code} - {response.text}")
+                 return False
+            print("Message delivered to WhatsApp!")
+            return True
+        print(f"❌ API Request Failed: {response.status_code} - {response.text}")
     except Exception as e:
         print(f"❌ Network Error: {e}")
+    return False
 
 if __name__ == "__main__":
     print("--- CallMeBot Test ---")
@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from render import render_site, slugify
+
+# Minimal DOM for site.js: enough elements and events to load a data file,
+# filter, sort and draw cards, with every drawn card reported back as JSON.
+HARNESS = r"""
+const fs = require('fs');
+const listeners = {};
+function node(tag) {
+    return {
+        tag, children: [], style: {}, className: '', textContent: '', dataset: {}, value: '', clientWidth: 1000,
+        append(...c) { this.children.push(...c); },
+        replaceChildren(f) { this.children = f ? (f.children || [f]) : []; },
+        addEventListener(type, fn) { (listeners[this.id + ':' + type] = listeners[this.id + ':' + type] || []).push(fn); },
+        getBoundingClientRect() { return { top: 0 }; },
+    };
+}
+const els = {};
+for (const id of ['grid', 'search', 'sort', 'count']) { els[id] = node('div'); els[id].id = id; }
+els.grid.dataset.src = process.argv[2];
+els.grid.dataset.placeholder = 'data:placeholder';
+global.document = { getElementById: id => els[id], createElement: node, createDocumentFragment: () => node('frag') };
+global.window = { innerHeight: 100000, addEventListener() {} };
+global.requestAnimationFrame = f => f();
+global.ResizeObserver = class { observe() {} };
+global.fetch = p => Promise.resolve({ json: () => JSON.parse(fs.readFileSync(p, 'utf8')) });
+require(process.argv[3]);
+
+function prices() {
+    return els.grid.children.filter(c => c.className === 'card').map(c => c.children[1].children[1].textContent);
+}
+setTimeout(() => {
+    const result = { count: els.count.textContent, empty: els.grid.children.filter(c => c.className === 'empty').map(c => c.textContent) };
+    for (const order of ['distance', 'price-asc', 'price-desc']) {
+        els.sort.value = order;
+        (listeners['sort:change'] || []).forEach(fn => fn());
+        result[order] = prices();
+    }
+    console.log(JSON.stringify(result));
+}, 50);
+"""
+
+LISTINGS = [
+    {'address': "1 A St", 'price': "$500,000", 'distance': 1.0},
+    {'address': "2 B St", 'price': "Contact agent", 'distance': 2.0},
+    {'address': "3 C St", 'price': "$300,000", 'distance': 3.0},
+    {'address': "4 D St", 'price': "Call for price", 'distance': 4.0},
+    {'address': "5 E St", 'price': "$700,000", 'distance': 5.0},
+]
+
+
+def check():
+    """
+    Renders a small site and runs its site.js under node against a stub DOM,
+    checking that the masjid page actually draws its cards in each sort order.
+    """
+    if not shutil.which('node'):
+        print("node not found; skipping the site.js check")
+        return True
+    out_dir = tempfile.mkdtemp(prefix="site_js_")
+    try:
+        listings = [{'address': l['address'], 'price': l['price'], 'link': f"https://example.com/{i}",
+                     'image': "", 'source': "Homes.com", 'city': "Phoenix",
+                     'nearby_masjids': [{'name': "Test Masjid", 'distance': l['distance']}]}
+                    for i, l in enumerate(LISTINGS)]
+        render_site(listings, [{'name': "Test Masjid"}], "Check", "None", out_dir=out_dir)
+        harness = os.path.join(out_dir, 'harness.js')
+        with open(harness, 'w') as f:
+            f.write(HARNESS)
+        data = os.path.join(out_dir, 'data', f"{slugify('Test Masjid')}.json")
+        run = subprocess.run(['node', harness, data, os.path.join(out_dir, 'site.js')],
+                             capture_output=True, text=True, timeout=30)
+        if run.returncode != 0:
+            print(f"site.js failed under node:\n{run.stderr}")
+            return False
+        result = json.loads(run.stdout)
+    finally:
+        shutil.rmtree(out_dir)
+
+    unknown = ["Contact agent", "Call for price"]
+    expected = {
+        'count': f"{len(LISTINGS)} of {len(LISTINGS)} listings",
+        'distance': [l['price'] for l in LISTINGS],
+        'price-asc': ["$300,000", "$500,000", "$700,000"] + unknown,
+        'price-desc': ["$700,000", "$500,000", "$300,000"] + unknown,
+    }
+    ok = not result['empty']
+    for key, want in expected.items():
+        if result[key] != want:
+            print(f"{key}: expected {want}, got {result[key]}")
+            ok = False
+    print("site.js check passed" if ok else "site.js check FAILED")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
@@ -0,0 +1,156 @@
+import json
+import os
+import random
+import sys
+import time
+
+CRAWL_SCHEDULE_FILE = 'crawl_schedule.json'
+# Every (city, source) pair starts on this cadence and adapts from there
+BASE_CRAWL_INTERVAL = 6 * 3600
+MIN_CRAWL_INTERVAL = 3600
+MAX_CRAWL_INTERVAL = 48 * 3600
+# Each next crawl time is moved by up to this fraction of the interval, so pairs don't fall into lockstep
+CRAWL_JITTER = 0.2
+# Weight of the latest crawl in a pair's running average of new matches
+YIELD_WEIGHT = 0.3
+# Due pairs crawled per run, highest yield first; the rest wait for the next run
+MAX_PAIRS_PER_RUN = 4
+# Longest the daemon sleeps between checks, so edits to the schedule file are noticed
+MAX_IDLE_SECONDS = 900
+# Shortest pause between checks, so a run that keeps failing can't spin
+MIN_IDLE_SECONDS = 30
+# A run that fails outright (e.g. the browser won't launch) retries its pairs after this, doubling per failure in a row
+FAILED_RUN_RETRY_SECONDS = 300
+
+
+def _key(pair):
+    return f"{pair[0]}|{pair[1]}"
+
+
+class CrawlScheduler:
+    """
+    Decides when each (city, source) pair is crawled again.
+
+    A crawl that found new matching listings halves the pair's interval; one
+    that found cards but nothing new stretches it by a quarter; one that came
+    back with no cards at all (empty results, a block or a captcha) doubles
+    it for every such crawl in a row. Intervals stay between
+    MIN_CRAWL_INTERVAL and MAX_CRAWL_INTERVAL and get CRAWL_JITTER applied.
+    When several pairs are due, the ones with the best running average of
+    new matches go first. State lives in crawl_schedule.json.
+    """
+
+    def __init__(self, pairs, path=CRAWL_SCHEDULE_FILE):
+        self.path = path
+        self.pairs = list(pairs)
+        self.failures = 0
+        stored = self.load()
+        self.state = {}
+        for pair in self.pairs:
+            # New pairs are due at once
+            self.state[_key(pair)] = stored.get(_key(pair)) or {
+                'interval': BASE_CRAWL_INTERVAL, 'next_due': 0, 'yield': 0.0,
+                'dry_streak': 0, 'crawls': 0, 'last_crawl': None,
+            }
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: ignoring unreadable crawl schedule {self.path}: {e}")
+            return {}
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def due(self, now=None, limit=MAX_PAIRS_PER_RUN):
+        """Pairs whose next crawl time has passed, best yield first."""
+        now = now or time.time()
+        ready = [pair for pair in self.pairs if self.state[_key(pair)]['next_due'] <= now]
+        ready.sort(key=lambda pair: (-self.state[_key(pair)]['yield'], self.state[_key(pair)]['next_due']))
+        return ready[:limit]
+
+    def next_due(self):
+        return min(self.state[_key(pair)]['next_due'] for pair in self.pairs)
+
+    def record(self, pair, stats, now=None):
+        """Updates a pair's cadence from one crawl's HouseFinder.pair_stats entry."""
+        now = now or time.time()
+        entry = self.state[_key(pair)]
+        if stats['cards'] == 0:
+            entry['dry_streak'] += 1
+            interval = BASE_CRAWL_INTERVAL * 2 ** entry['dry_streak']
+        elif stats['new_matches']:
+            entry['dry_streak'] = 0
+            interval = entry['interval'] / 2
+        else:
+            entry['dry_streak'] = 0
+            interval = entry['interval'] * 1.25
+        entry['interval'] = min(MAX_CRAWL_INTERVAL, max(MIN_CRAWL_INTERVAL, interval))
+        entry['yield'] = (1 - YIELD_WEIGHT) * entry['yield'] + YIELD_WEIGHT * stats['new_matches']
+        entry['crawls'] += 1
+        entry['last_crawl'] = {'at': now, **stats}
+        entry['next_due'] = now + entry['interval'] * random.uniform(1 - CRAWL_JITTER, 1 + CRAWL_JITTER)
+
+    def run_once(self, finder_factory):
+        """Crawls the pairs that are due in one HouseFinder run. Returns the pairs crawled."""
+        pairs = self.due()
+        if not pairs:
+            return []
+        print(f"--- Scheduled crawl: {', '.join(f'{city}/{source}' for city, source in pairs)} ---")
+        try:
+            finder = finder_factory()
+            finder.run(pairs=pairs)
+        except Exception as e:
+            # Not the pairs' fault, so their cadence and yield are left alone; only the retry is pushed back
+            self.failures += 1
+            delay = min(MAX_CRAWL_INTERVAL, FAILED_RUN_RETRY_SECONDS * 2 ** (self.failures - 1))
+            print(f"Scheduled crawl failed: {e}. Retrying these pairs in {delay / 60:.0f} min.")
+            retry_at = time.time() + delay
+            for pair in pairs:
+                self.state[_key(pair)]['next_due'] = retry_at
+            self.save()
+            return []
+        self.failures = 0
+        for pair in pairs:
+            self.record(pair, finder.pair_stats.get(pair, {'cards': 0, 'new': 0, 'new_matches': 0}))
+        self.save()
+        print(self.report())
+        return pairs
+
+    def run_forever(self, finder_factory):
+        print(f"Crawl scheduler started for {len(self.pairs)} city/source pairs (Ctrl+C to stop)")
+        try:
+            while True:
+                self.run_once(finder_factory)
+                time.sleep(min(MAX_IDLE_SECONDS, max(MIN_IDLE_SECONDS, self.next_due() - time.time())))
+        except KeyboardInterrupt:
+            print("Crawl scheduler stopped.")
+
+    def report(self, now=None):
+        now = now or time.time()
+        lines = [f"{'pair':<32} {'every':>7} {'next in':>8} {'yield':>6} {'dry':>4}"]
+        for pair in sorted(self.pairs, key=lambda p: self.state[_key(p)]['next_due']):
+            entry = self.state[_key(pair)]
+            lines.append(f"{pair[0] + ' / ' + pair[1]:<32} {entry['interval'] / 3600:>6.1f}h "
+                         f"{max(0, entry['next_due'] - now) / 3600:>7.1f}h {entry['yield']:>6.2f} {entry['dry_streak']:>4}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Usage: python crawl_scheduler.py           (run continuously)
+    #        python crawl_scheduler.py status    (show the schedule)
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+    from find_houses import HouseFinder, ALL_PAIRS
+    scheduler = CrawlScheduler(ALL_PAIRS)
+    if sys.argv[1:] == ['status']:
+        print(scheduler.report())
+    else:
+        scheduler.run_forever(HouseFinder)
@@ -1,9 +1,10 @@
 from playwright.sync_api import sync_playwright
+from html_parsers import parse_html
+from browser_service import lease_browser
 
 def debug_fsbo():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
+    with sync_playwright() as p, lease_browser(p, headless=False) as lease:
+        page = lease.new_page()
         
         url = "https://www.forsalebyowner.com/search/list/Phoenix-AZ/2-beds/2-baths/single-story"
         print(f"Going to {url}")
@@ -17,11 +18,10 @@ def debug_fsbo():
             with open("debug_fsbo.html", "w", encoding="utf-8") as f:
                 f.write(content)
             print("Saved debug_fsbo.html")
+            print(f"Offline parser found {len(parse_html('ForSaleByOwner', content, url))} cards")
             
         except Exception as e:
             print(f"Error: {e}")
-            
-        browser.close()
 
 if __name__ == "__main__":
     debug_fsbo()
@@ -1,12 +1,9 @@
 from playwright.sync_api import sync_playwright
-from fake_useragent import UserAgent
+from browser_service import lease_browser
 
 def debug():
-    ua = UserAgent()
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(user_agent=ua.random)
-        page = context.new_page()
+    with sync_playwright() as p, lease_browser(p, headless=True) as lease:
+        page = lease.new_page()
         
         # Try a simpler URL first or the target one
         url = "https://www.realtor.com/realestateandhomes-search/Phoenix_AZ/beds-3/baths-3/type-single-story-home"
@@ -26,8 +23,6 @@ def debug():
             
         except Exception as e:
             print(f"Error: {e}")
-            
-        browser.close()
 
 if __name__ == "__main__":
     debug()
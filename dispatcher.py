@@ -0,0 +1,230 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from geocode_queue import RateLimiter
+from whatsapp_daemon import enqueue_whatsapp_message
+
+DISPATCH_WORKERS = 8
+SEND_TIMEOUT = 20
+# Attempts per message, including the first; retries wait BACKOFF_BASE_SECONDS * 2**n (with jitter)
+MAX_SEND_ATTEMPTS = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+PROVIDER_URLS = {
+    'textmebot': "https://api.textmebot.com",
+    'callmebot': "https://api.callmebot.com",
+    'telegram': "https://api.telegram.org",
+}
+# Messages per second each provider is sent, across all of its recipients.
+# TextMeBot and CallMeBot ask for a few seconds between messages; Telegram
+# allows about 30 per second per bot.
+PROVIDER_RATES = {
+    'textmebot': 0.2,
+    'callmebot': 0.2,
+    'telegram': 25.0,
+}
+
+
+class DeliveryError(Exception):
+    """A send the provider rejected; `retry` says whether trying again could help."""
+
+    def __init__(self, message, retry=False, retry_after=None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+def _request(provider, channel, text):
+    """(method, path, requests kwargs) for one message on `channel`."""
+    if provider == 'textmebot':
+        return 'GET', "/send.php", {'params': {'recipient': channel['target'], 'apikey': channel['apikey'], 'text': text}}
+    if provider == 'callmebot':
+        return 'GET', "/whatsapp.php", {'params': {'phone': channel['target'], 'apikey': channel['apikey'], 'text': text}}
+    if provider == 'telegram':
+        return 'POST', f"/bot{channel['apikey']}/sendMessage", {'json': {'chat_id': channel['target'], 'text': text}}
+    raise ValueError(f"Unknown notification provider: {provider}")
+
+
+def _check(provider, response):
+    """Raises DeliveryError unless `response` means the message was accepted."""
+    if response.status_code == 429 or response.status_code >= 500:
+        retry_after = response.headers.get('Retry-After')
+        raise DeliveryError(f"HTTP {response.status_code}", retry=True,
+                            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+    if response.status_code != 200:
+        raise DeliveryError(f"HTTP {response.status_code}: {response.text[:200]}")
+    if provider == 'callmebot' and "Error" in response.text:
+        raise DeliveryError(f"CallMeBot: {response.text[:200]}")
+    if provider == 'telegram':
+        data = response.json()
+        if not data.get('ok'):
+            raise DeliveryError(f"Telegram: {data.get('description')}")
+
+
+def channels_from_env():
+    """
+    Every configured recipient, as {'provider', 'target', 'apikey'}. Each
+    provider's target variable may list several recipients, comma-separated.
+    WHATSAPP_GROUP names WhatsApp Web chats, sent by whatsapp_daemon.py.
+    """
+    configured = [
+        ('textmebot', "TEXTMEBOT_APIKEY", "TEXTMEBOT_TARGET"),
+        ('callmebot', "CALLMEBOT_APIKEY", "CALLMEBOT_PHONE"),
+        ('telegram', "TELEGRAM_BOT_TOKEN", "TELEGRAM_CHAT_ID"),
+    ]
+    channels = []
+    for provider, key_var, target_var in configured:
+        apikey = os.getenv(key_var)
+        if not apikey:
+            continue
+        for target in (os.getenv(target_var) or "").split(','):
+            if target.strip():
+                channels.append({'provider': provider, 'target': target.strip(), 'apikey': apikey})
+    for group in (os.getenv("WHATSAPP_GROUP") or "").split(','):
+        if group.strip():
+            channels.append({'provider': 'whatsapp', 'target': group.strip(), 'apikey': None})
+    return channels
+
+
+def recipient_key(channel):
+    return f"{channel['provider']}:{channel['target']}"
+
+
+class DeliveryReport:
+    """Per-provider delivery counts and latencies; thread-safe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.providers = {}
+
+    def _entry(self, provider):
+        return self.providers.setdefault(provider, {'sent': 0, 'queued': 0, 'failed': 0, 'retries': 0, 'latencies': []})
+
+    def record(self, provider, ok, seconds, retries):
+        with self.lock:
+            entry = self._entry(provider)
+            entry['sent' if ok else 'failed'] += 1
+            entry['retries'] += retries
+            if ok:
+                entry['latencies'].append(seconds)
+
+    def record_queued(self, provider):
+        """A message handed to a sender daemon, which does the actual delivery later."""
+        with self.lock:
+            self._entry(provider)['queued'] += 1
+
+    def summary(self):
+        lines = []
+        with self.lock:
+            for provider, entry in sorted(self.providers.items()):
+                latencies = sorted(entry['latencies'])
+                if entry['queued']:
+                    lines.append(f"{provider}: {entry['queued']} queued for whatsapp_daemon.py (delivery not confirmed)")
+                if not (entry['sent'] or entry['failed']):
+                    continue
+                line = f"{provider}: {entry['sent']} sent, {entry['failed']} failed, {entry['retries']} retries"
+                if latencies:
+                    p50 = latencies[len(latencies) // 2]
+                    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                    line += f", latency p50 {p50 * 1000:.0f} ms / p95 {p95 * 1000:.0f} ms / max {latencies[-1] * 1000:.0f} ms"
+                lines.append(line)
+        return "\n".join(lines) or "No notifications sent."
+
+
+class Dispatcher:
+    """
+    Sends notifications through TextMeBot, CallMeBot and Telegram, and queues
+    WhatsApp Web messages for whatsapp_daemon.py.
+
+    Each provider gets one requests.Session whose keep-alive pool is shared by
+    every send to it, and one RateLimiter that spaces its sends across all
+    recipients. Different recipients are served concurrently on a thread
+    pool; one recipient's messages go out in order, so a split digest arrives
+    as (1/3), (2/3), (3/3). Timeouts, connection errors, 429s and 5xx
+    responses are retried with exponential backoff (honouring Retry-After);
+    other rejections fail at once. Every outcome is added to `report`.
+
+    `base_urls` and `rates` override PROVIDER_URLS and PROVIDER_RATES, e.g. to
+    point everything at a local stub server (see bench_dispatcher.py).
+    """
+
+    def __init__(self, workers=DISPATCH_WORKERS, base_urls=None, rates=None):
+        self.base_urls = {**PROVIDER_URLS, **(base_urls or {})}
+        rates = {**PROVIDER_RATES, **(rates or {})}
+        self.limiters = {provider: RateLimiter(rate) for provider, rate in rates.items()}
+        self.sessions = {}
+        for provider in self.base_urls:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+            self.sessions[provider] = session
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notify")
+        self.report = DeliveryReport()
+
+    def send(self, channel, text):
+        """
+        Delivers one message, retrying transient failures. Returns True once the
+        provider accepts it, or for WhatsApp once it is in the daemon's spool.
+        """
+        provider = channel['provider']
+        if provider == 'whatsapp':
+            # Queued, not sent: whatsapp_daemon.py delivers from its spool, retrying until
+            # WA_MAX_ATTEMPTS. The spool survives restarts, so the listings count as
+            # notified; a message it gives up on is left in wa_outbox/failed/.
+            try:
+                enqueue_whatsapp_message(channel['target'], text)
+            except OSError as e:
+                print(f"❌ Could not queue WhatsApp message for {channel['target']}: {e}")
+                self.report.record(provider, False, 0.0, 0)
+                return False
+            self.report.record_queued(provider)
+            return True
+        method, path, kwargs = _request(provider, channel, text)
+        url = self.base_urls[provider] + path
+        started = time.monotonic()
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            self.limiters[provider].wait()
+            try:
+                response = self.sessions[provider].request(method, url, timeout=SEND_TIMEOUT, **kwargs)
+                _check(provider, response)
+                self.report.record(provider, True, time.monotonic() - started, attempt)
+                return True
+            except DeliveryError as e:
+                error, retry, retry_after = e, e.retry, e.retry_after
+            except (requests.RequestException, ValueError) as e:
+                error, retry, retry_after = e, True, None
+            if not retry or attempt == MAX_SEND_ATTEMPTS - 1:
+                break
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+            time.sleep(max(delay, retry_after or 0))
+        print(f"❌ {provider} send to {channel['target']} failed after {attempt + 1} attempts: {error}")
+        self.report.record(provider, False, time.monotonic() - started, attempt)
+        return False
+
+    def sender(self, channel):
+        """send(text) -> bool for one channel, as Notifier.notify expects."""
+        return lambda text: self.send(channel, text)
+
+    def send_all(self, channels, text):
+        """Sends `text` to every channel concurrently. Returns {recipient: delivered}."""
+        futures = {recipient_key(c): self.pool.submit(self.send, c, text) for c in channels}
+        return {recipient: future.result() for recipient, future in futures.items()}
+
+    def notify_all(self, notifier, channels, run_id=None):
+        """Runs notifier.notify for every channel concurrently. Returns {recipient: messages delivered}."""
+        futures = {recipient_key(c): self.pool.submit(notifier.notify, recipient_key(c), c['provider'],
+                                                      self.sender(c), run_id)
+                   for c in channels}
+        return {recipient: future.result() for recipient, future in futures.items()}
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        for session in self.sessions.values():
+            session.close()
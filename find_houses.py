@@ -1,7 +1,7 @@
 import json
 import time
-import math
 import os
+import threading
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -9,27 +9,87 @@ from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 from playwright.sync_api import sync_playwright
 from fake_useragent import UserAgent
-
-try:
-    from playwright_stealth import stealth_sync
-    HAS_STEALTH = True
-except ImportError:
-    HAS_STEALTH = False
-    print("Notice: playwright-stealth not installed, using manual stealth method.")
+from geocode_cache import GeocodeCache
+from geocode_queue import GeocodeWorker, RateLimiter, GEOCODE_REQUESTS_PER_SECOND
+from local_geocoder import LocalGeocoder
+from listing_keys import canonical_link, address_key
+from masjid_index import MasjidMatcher
+from listing_store import SeenListingStore, catalog_fingerprint
+from listing_db import ListingDB
+from price_history import PriceHistory
+from notifier import Notifier
+from dispatcher import Dispatcher, channels_from_env
+from browser_service import lease_browser
+from sources import search_url, iter_cards, capture_responses
+from page_readiness import PageReadiness, CAPTCHA_SOLVE_TIMEOUT
+from network_policy import NetworkPolicy
+from render import render_site
+from image_cache import ImageCache, load_thumbnail_map
 
 # Configuration
 MASJIDS_FILE = 'masjids.json'
 LISTINGS_FILE = 'listings.json'
 OUTPUT_HTML = 'index.html'
 SEARCH_RADIUS_MILES = 5
+# Set GEOCODE_OFFLINE=1 to resolve addresses only from the local address-point file
+GEOCODE_OFFLINE = os.getenv('GEOCODE_OFFLINE') == '1'
+# Nominatim requests per second; only raise GEOCODE_RATE for a self-hosted Nominatim
+GEOCODE_RATE = float(os.getenv('GEOCODE_RATE', GEOCODE_REQUESTS_PER_SECOND))
 # Cities to search
 CITIES = ['Phoenix', 'Peoria', 'Glendale', 'Scottsdale', 'Chandler', 'Tempe']
+# Sources crawled for each city (Realtor.com is off: it usually needs a captcha solved)
+CRAWL_SOURCES = ['ForSaleByOwner', 'Homes.com']
+ALL_PAIRS = [(city, source) for city in CITIES for source in CRAWL_SOURCES]
+# Set CONCURRENT_CRAWL=1 to crawl all city/source pairs in parallel browser contexts
+CONCURRENT_CRAWL = os.getenv('CONCURRENT_CRAWL') == '1'
+# Pages are awaited on readiness events; set SLOW_MO_MS to slow the browser down for debugging
+SLOW_MO_MS = int(os.getenv('SLOW_MO_MS', '0'))
+# Images, fonts, media and ad/analytics requests are blocked while scraping; BLOCK_RESOURCES=0 turns this off
+BLOCK_RESOURCES = os.getenv('BLOCK_RESOURCES', '1') != '0'
+# Listing photos are downloaded as local thumbnails for the site; CACHE_IMAGES=0 hotlinks the source's photo instead
+CACHE_IMAGES = os.getenv('CACHE_IMAGES', '1') != '0'
+# Listings whose card is unchanged since the last run reuse their stored coordinates and matches; INCREMENTAL=0 reprocesses everything
+INCREMENTAL = os.getenv('INCREMENTAL', '1') != '0'
 
 class HouseFinder:
     def __init__(self):
         self.masjids = self.load_masjids()
+        self.masjid_matcher = MasjidMatcher(self.masjids, SEARCH_RADIUS_MILES)
         self.listings = []
+        # Hashed dedupe index: canonical link, plus street address and city to
+        # catch the same house listed by another source or found by another city's search
+        self.seen_links = set()
+        self.seen_addresses = set()
+        self.duplicates_skipped = 0
+        self.geocodes_skipped = 0
+        # Per (city, source) yield of this run, for the crawl scheduler
+        self.pair_stats = {}
+        self.new_links = set()
+        self.crawled_pairs = ALL_PAIRS
         self.ua = UserAgent()
+        # One geocoder client for the whole run, backed by a persistent cache
+        self.geolocator = Nominatim(user_agent="house_finder_bot_v2")
+        self.geocode_cache = GeocodeCache()
+        # Optional offline backend; Nominatim is only asked about addresses it can't place
+        self.local_geocoder = LocalGeocoder.from_file()
+        self.geocode_limiter = RateLimiter(GEOCODE_RATE)
+        # Geocoding runs on its own thread so the browser keeps navigating
+        self.geocode_worker = GeocodeWorker(self.geocode_listing, self.match_listing)
+        self.listings_lock = threading.Lock()
+        # Matches are upserted into listings.db as they arrive; listings.json is exported from it
+        self.listing_db = ListingDB()
+        # Every card seen is logged with its price, for price-drop and days-on-market queries
+        self.price_history = PriceHistory()
+        self.image_cache = ImageCache() if CACHE_IMAGES else None
+        self.readiness = PageReadiness()
+        self.network_policy = NetworkPolicy(enabled=BLOCK_RESOURCES)
+        self.catalog = catalog_fingerprint(self.masjids, SEARCH_RADIUS_MILES)
+        self.seen_store = SeenListingStore() if INCREMENTAL else None
+        if self.seen_store and self.seen_store.stale_matches(self.catalog):
+            # masjids.json or the radius changed since the last run
+            stored = self.seen_store.all_listings()
+            self.rematch_listings(stored)
+            self.seen_store.rematched(self.catalog, stored)
 
     def load_masjids(self):
         try:
@@ -40,174 +100,183 @@ class HouseFinder:
             return []
 
     def get_coordinates(self, address):
-        geolocator = Nominatim(user_agent="house_finder_bot_v2")
+        if self.local_geocoder:
+            coords = self.local_geocoder.geocode(address)
+            if coords:
+                return coords
+
+        hit, coords = self.geocode_cache.get(address)
+        if hit:
+            return coords
+        if GEOCODE_OFFLINE:
+            return None, None
+
+        lat, lon = None, None
+        self.geocode_limiter.wait() # Be nice to Nominatim
         try:
-            location = geolocator.geocode(address, timeout=10)
+            location = self.geolocator.geocode(address, timeout=10)
             if location:
-                return location.latitude, location.longitude
+                lat, lon = location.latitude, location.longitude
         except Exception as e:
+            # Transient errors (timeouts, rate limits) are not cached
             print(f"Geocode error for {address}: {e}")
-        return None, None
+            return None, None
 
-    def haversine_distance(self, lat1, lon1, lat2, lon2):
-        R = 3958.8  # Earth radius in miles
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = math.sin(dlat / 2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        return R * c
+        self.geocode_cache.put(address, lat, lon)
+        return lat, lon
 
     def get_nearby_masjids(self, lat, lon):
-        nearby = []
-        for masjid in self.masjids:
-            if masjid.get('lat') and masjid.get('lon'):
-                dist = self.haversine_distance(lat, lon, masjid['lat'], masjid['lon'])
-                if dist <= SEARCH_RADIUS_MILES:
-                    nearby.append({
-                        'name': masjid['name'],
-                        'distance': dist
-                    })
-        nearby.sort(key=lambda x: x['distance'])
+        nearby, _ = self.masjid_matcher.match_one(lat, lon)
         return nearby
 
+    def rematch_listings(self, listings):
+        """
+        Re-runs masjid matching for listings that already carry coordinates
+        (e.g. after editing masjids.json) in one vectorized pass.
+        Returns the listings that still have at least one masjid in range.
+        """
+        located = [l for l in listings if l.get('lat') is not None and l.get('lon') is not None]
+        nearby, _ = self.masjid_matcher.match([l['lat'] for l in located], [l['lon'] for l in located], with_nearest=False)
+        matched = []
+        for listing, nearby_list in zip(located, nearby):
+            listing['nearby_masjids'] = nearby_list
+            if nearby_list:
+                matched.append(listing)
+        return matched
+
     def scrape_realtor(self, page, city):
         print(f"--- Scraping Realtor.com for {city} ---")
-        url = f"https://www.realtor.com/realestateandhomes-search/{city}_AZ/beds-2/baths-2/type-single-story-home"
+        url = search_url("Realtor.com", city)
         try:
-            print(f"Navigating to {url}...")
-            page.goto(url, timeout=90000)
-            
-            # Check for captcha or block
-            if "unblockrequest" in page.content() or "captcha" in page.content().lower():
-                print("⚠ DETECTED BLOCK/CAPTCHA on Realtor.com.")
-                print("Please solve the CAPTCHA in the browser window if visible...")
-                page.wait_for_timeout(15000) # Give user 15s to solve
-            
-            # Wait for content
-            try:
-                page.wait_for_selector('div[data-testid="property-card"]', timeout=10000)
-            except:
-                print("Timed out waiting for property-card. Content might be different or blocked.")
-
-            cards = page.locator('div[data-testid="property-card"]').all()
-            print(f"Found {len(cards)} cards on Realtor in {city}")
-            
-            for card in cards:
-                try:
-                    price = card.locator('[data-testid="card-price"]').inner_text(timeout=2000)
-                    # Address is often split in spans
-                    address_parts = card.locator('[data-testid="card-address"] [data-testid]').all_inner_texts()
-                    if address_parts:
-                        address = ", ".join(address_parts)
-                    else:
-                        address = card.locator('[data-testid="card-address"]').inner_text(timeout=2000).replace('\n', ', ')
-                        
-                    link_locator = card.locator('a[href^="/realestateandhomes-detail"]')
-                    if link_locator.count() > 0:
-                        link = "https://www.realtor.com" + link_locator.first.get_attribute('href')
-                    else:
-                        link = url
-                    
-                    img_locator = card.locator('img')
-                    image = img_locator.first.get_attribute('src') if img_locator.count() > 0 else ""
-
-                    self.process_listing(address, price, link, image, "Realtor.com", city)
-                except Exception as e:
-                    # print(f"Error parsing card: {e}")
-                    continue
+            with capture_responses(page, "Realtor.com") as capture:
+                print(f"Navigating to {url}...")
+                page.goto(url, timeout=90000, wait_until='domcontentloaded')
+                
+                # Check for captcha or block
+                content = page.content()
+                if "unblockrequest" in content or "captcha" in content.lower():
+                    print("⚠ DETECTED BLOCK/CAPTCHA on Realtor.com.")
+                    print("Please solve the CAPTCHA in the browser window if visible...")
+                    # Continues as soon as the results show up
+                    self.readiness.wait(page, "Realtor.com", city, timeout=CAPTCHA_SOLVE_TIMEOUT)
+                
+                # Wait for content
+                def settle(page):
+                    if not self.readiness.wait(page, "Realtor.com", city):
+                        print("Timed out waiting for property-card. Content might be different or blocked.")
+                settle(page)
+
+                found = 0
+                for card in iter_cards(page, "Realtor.com", city, settle, capture=capture):
+                    found += 1
+                    self.process_card(card, "Realtor.com", city)
+                print(f"Found {found} cards on Realtor in {city}")
         except Exception as e:
             print(f"Realtor scrape error: {e}")
 
     def scrape_fsbo(self, page, city):
          print(f"--- Scraping ForSaleByOwner.com for {city} ---")
-         # URL format: .../Phoenix-AZ/2-beds/2-baths/single-story
-         url = f"https://www.forsalebyowner.com/search/list/{city}-AZ/2-beds/2-baths/single-story"
+         url = search_url("ForSaleByOwner", city)
          try:
-             page.goto(url, timeout=60000)
-             # Wait for anything useful
-             page.wait_for_timeout(3000)
-             
-             cards = page.locator('div[class*="card-"]').all()
-             if not cards:
-                 cards = page.locator('div.shadow.rounded-lg.relative.flex').all()
-
-             print(f"Found {len(cards)} cards on FSBO in {city}")
-             
-             for card in cards:
-                 try:
-                     # New Robust Selectors
-                     # Link is usually on the address <a>
-                     link_el = card.locator('a[href^="/listing/"]').first
-                     if not link_el.count():
-                         continue
-
-                     link = link_el.get_attribute('href')
-                     
-                     # Address is the text of that link, usually the first text node.
-                     # The city/state is often in a child span. We must exclude it.
-                     address = link_el.evaluate("el => el.childNodes[0].textContent").strip()
-
-                     # Price is in a sibling/parent container but inside the card
-                     # It has class "text-xl" and starts with $
-                     price_el = card.locator('span.text-xl').filter(has_text="$").first
-                     price = price_el.inner_text() if price_el.count() else "N/A"
-
-                     # Image
-                     img_el = card.locator('img').first
-                     image = img_el.get_attribute('src') if img_el.count() else ""
-
-                     if link and not link.startswith('http'):
-                        link = "https://www.forsalebyowner.com" + link
-                     
-                     self.process_listing(address, price, link, image, "ForSaleByOwner", city)
-                 except Exception as e:
-                     print(f"FSBO card parse error: {e}")
-                     continue
+             with capture_responses(page, "ForSaleByOwner") as capture:
+                 page.goto(url, timeout=60000, wait_until='domcontentloaded')
+                 # Wait for anything useful
+                 settle = lambda page: self.readiness.wait(page, "ForSaleByOwner", city)
+                 settle(page)
+                 
+                 found = 0
+                 for card in iter_cards(page, "ForSaleByOwner", city, settle, capture=capture):
+                     found += 1
+                     self.process_card(card, "ForSaleByOwner", city)
+                 print(f"Found {found} cards on FSBO in {city}")
          except Exception as e:
              print(f"FSBO scrape error: {e}")
 
     def scrape_homes_com(self, page, city):
         print(f"--- Scraping Homes.com for {city} ---")
-        # Homes.com URL: https://www.homes.com/phoenix-az/homes-for-sale/2-bedroom/?property_type=1&bathrooms=2g
-        # property_type=1 is typically House/Single Family
-        url = f"https://www.homes.com/{city.lower()}-az/homes-for-sale/2-bedroom/?property_type=1&bathrooms=2g"
+        url = search_url("Homes.com", city)
         
         try:
-            page.goto(url, timeout=60000)
-            page.wait_for_timeout(3000)
-            
-            # Homes.com selectors
-            cards = page.locator('article[data-testid="listing-card"]').all()
-            if not cards:
-                cards = page.locator('.placards-list ul li article').all()
-            
-            print(f"Found {len(cards)} cards on Homes.com in {city}")
-            
-            for card in cards:
-                try:
-                    price = card.locator('.price-container').first.inner_text()
-                    address = card.locator('.property-name').first.inner_text()
-                    link_el = card.locator('a').first
-                    link = "https://www.homes.com" + link_el.get_attribute('href')
-                    
-                    # Image
-                    img_el = card.locator('img').first
-                    image = img_el.get_attribute('src')
-
-                    self.process_listing(address, price, link, image, "Homes.com", city)
-                except:
-                    continue
+            with capture_responses(page, "Homes.com") as capture:
+                page.goto(url, timeout=60000, wait_until='domcontentloaded')
+                settle = lambda page: self.readiness.wait(page, "Homes.com", city)
+                settle(page)
+                
+                found = 0
+                for card in iter_cards(page, "Homes.com", city, settle, capture=capture):
+                    found += 1
+                    self.process_card(card, "Homes.com", city)
+                print(f"Found {found} cards on Homes.com in {city}")
         except Exception as e:
             print(f"Homes.com scrape error: {e}")
 
-    def process_listing(self, address, price, link, image, source, city):
-        if any(l['link'] == link for l in self.listings):
-            return
-
-        # basic cleaning
+    def scrape_saved_page(self, path, source, city):
+        """Feeds a saved results page (e.g. debug_fsbo.html) through the pipeline without a browser."""
+        from html_parsers import parse_file
+        cards = parse_file(source, path, search_url(source, city))
+        print(f"Parsed {len(cards)} cards from {path} ({source}, {city})")
+        for card in cards:
+            self.process_card(card, source, city)
+
+    def _pair(self, city, source):
+        # Caller holds self.listings_lock
+        return self.pair_stats.setdefault((city, source), {'cards': 0, 'new': 0, 'new_matches': 0})
+
+    def process_card(self, card, source, city):
+        with self.listings_lock:
+            self._pair(city, source)['cards'] += 1
+        self.process_listing(card['address'], card['price'], card['link'], card['image'], source, city,
+                             card.get('lat'), card.get('lon'))
+
+    def process_listing(self, address, price, link, image, source, city, lat=None, lon=None):
         address = address.strip()
-
-        # print(f"Processing: {address}...") # Debug
+        # The canonical form is only a key; listings keep the URL the source gave
+        key = canonical_link(link)
+        addr_key = address_key(address, city)
+        with self.listings_lock:
+            if key in self.seen_links or (addr_key and addr_key in self.seen_addresses):
+                self.duplicates_skipped += 1
+                return
+            self.seen_links.add(key)
+            if addr_key:
+                self.seen_addresses.add(addr_key)
+        self.price_history.record(key, price)
+
+        card = {
+            'address': address,
+            'price': price,
+            'link': link,
+            'image': image,
+            'source': source,
+            'city': city,
+            # Set when the source's structured data already had coordinates
+            'lat': lat,
+            'lon': lon
+        }
+        status, stored = self.seen_store.classify(card) if self.seen_store else ('new', None)
+        if status == 'new':
+            with self.listings_lock:
+                self._pair(city, source)['new'] += 1
+                self.new_links.add(key)
+        if self.seen_store:
+            if status == 'unchanged' and stored['lat'] is not None:
+                # Same card as last run: reuse its coordinates and matches
+                if stored['nearby_masjids']:
+                    self.add_listing(self.seen_store.listing(key))
+                return
+            if stored and stored['address'] == address and stored['lat'] is not None and lat is None:
+                # Only the price or photo changed; the house hasn't moved
+                card['lat'], card['lon'] = stored['lat'], stored['lon']
+
+        # Hand the raw card to the geocode stage; matching happens when coordinates arrive
+        self.geocode_worker.submit(card)
+
+    def geocode_listing(self, card):
+        # Runs on the geocode worker thread
+        if card['lat'] is not None and card['lon'] is not None:
+            self.geocodes_skipped += 1
+            return card['lat'], card['lon']
+        address, city = card['address'], card['city']
         lat, lon = self.get_coordinates(address)
         if not lat:
             # Try appending city/state
@@ -215,239 +284,160 @@ class HouseFinder:
                 addr_full = f"{address}, {city}, AZ"
                 # print(f"  Geocode retry with: {addr_full}")
                 lat, lon = self.get_coordinates(addr_full)
-        
+        return lat, lon
+
+    def match_listing(self, card, lat, lon):
+        # Runs on the geocode worker thread
+        address = card['address']
         if lat and lon:
-            nearby_list = self.get_nearby_masjids(lat, lon)
+            nearby_list, nearest_dist = self.masjid_matcher.match_one(lat, lon)
+            if self.seen_store:
+                self.seen_store.record(card, lat, lon, nearby_list)
             if nearby_list:
                 print(f"✅ MATCH: {address} is near {nearby_list[0]['name']}")
-                self.listings.append({
+                with self.listings_lock:
+                    if canonical_link(card['link']) in self.new_links:
+                        self._pair(card['city'], card['source'])['new_matches'] += 1
+                self.add_listing({
                     'address': address,
-                    'price': price,
-                    'link': link,
-                    'image': image,
-                    'source': source,
+                    'price': card['price'],
+                    'link': card['link'],
+                    'image': card['image'],
+                    'source': card['source'],
                     'nearby_masjids': nearby_list,
-                    'city': city
+                    'city': card['city'],
+                    'lat': lat,
+                    'lon': lon
                 })
             else:
-                # Debug: why not?
-                # Calculate distance to nearest just for info
-                nearest_dist = 999
-                for m in self.masjids:
-                    if m.get('lat'):
-                        d = self.haversine_distance(lat, lon, m['lat'], m['lon'])
-                        if d < nearest_dist: nearest_dist = d
+                # Debug: why not? Nearest distance comes from the same computation
                 print(f"  Skipped {address}: Nearest Masjid is {nearest_dist:.2f} mi away (> {SEARCH_RADIUS_MILES})")
         else:
+            if self.seen_store:
+                self.seen_store.record(card, None, None, [])
             print(f"  ❌ Geocode failed for {address}")
-            
-        time.sleep(0.5) # Slight delay to be nice to Nominatim 
 
-    def save_listings(self):
-        with open(LISTINGS_FILE, 'w') as f:
-            json.dump(self.listings, f, indent=4)
-        print(f"Saved {len(self.listings)} listings to {LISTINGS_FILE}")
+    def add_listing(self, listing):
+        with self.listings_lock:
+            self.listings.append(listing)
+        self.listing_db.upsert(listing) # Queued; the writer thread commits it
+        if self.image_cache:
+            self.image_cache.request(listing['image']) # Downloaded in the background
 
-    def run(self):
+    def save_listings(self):
+        # listings.db is already durable; this only refreshes the compatibility export
+        count = self.listing_db.export_json(LISTINGS_FILE, self.listing_db.run_id)
+        print(f"Saved {count} listings to {LISTINGS_FILE}")
+
+    def save_seen_store(self):
+        if self.seen_store:
+            self.seen_store.save(self.catalog)
+
+    def run(self, concurrent=CONCURRENT_CRAWL, pairs=None):
+        """Crawls `pairs` of (city, source), by default every city on every source, then finishes the run."""
+        start = time.monotonic()
+        self.crawled_pairs = list(pairs) if pairs is not None else ALL_PAIRS
+        if concurrent:
+            from async_crawler import AsyncCrawler
+            AsyncCrawler(self).crawl(self.crawled_pairs)
+        else:
+            self.crawl_sequential(self.crawled_pairs)
+        self.crawl_seconds = time.monotonic() - start
+        print(self.readiness.report(self.crawl_seconds))
+        print(self.network_policy.report())
+        self.readiness.save()
+
+        self.finish_run()
+
+    def crawl_sequential(self, pairs):
+        scrapers = {
+            'Realtor.com': self.scrape_realtor,
+            'ForSaleByOwner': self.scrape_fsbo,
+            'Homes.com': self.scrape_homes_com,
+        }
         # HEADLESS=False is crucial for Realtor.com
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False, slow_mo=500) 
-            # Fixed modern User Agent
-            fixed_ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            
-            context = browser.new_context(
-                user_agent=fixed_ua,
-                viewport={'width': 1920, 'height': 1080},
-                locale='en-US',
-                timezone_id='America/Phoenix'
-            )
-            
-            # Enable stealth manually
-            page = context.new_page()
-            
-            if HAS_STEALTH:
-                stealth_sync(page)
-            
-            # Manual Stealth: Overwrite webdriver property
-            page.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-            """)
-
-            for city in CITIES:
-                # self.scrape_realtor(page, city)
-                # self.save_listings()
-                self.scrape_fsbo(page, city)
-                self.save_listings()
-                self.scrape_homes_com(page, city)
-                self.save_listings()
-            
-            browser.close()
+        # A warm context from browser_service.py when BROWSER_SERVICE names it, otherwise a fresh launch
+        with sync_playwright() as p, lease_browser(p, headless=False, slow_mo=SLOW_MO_MS) as lease:
+            self.network_policy.install(lease.context)
+
+            # Comes with the stealth scripts, whether the context was leased or launched here
+            page = lease.new_page()
+
+            for i, (city, source) in enumerate(pairs):
+                scrapers[source](page, city)
+                if i + 1 == len(pairs) or pairs[i + 1][0] != city:
+                    self.geocode_cache.save()
+                    self.save_seen_store()
+
+    def finish_run(self):
+        # Scraping is done; let the geocode stage drain before the final save
+        self.geocode_worker.close()
+        print(self.geocode_worker.stats(self.crawl_seconds))
+        partial = set(self.crawled_pairs) != set(ALL_PAIRS)
+        if partial:
+            # Pairs not crawled this time keep what the previous run found for them
+            carried = self.listing_db.carry_forward(self.crawled_pairs)
+            with self.listings_lock:
+                self.listings.extend(carried)
+            print(f"Partial crawl of {len(self.crawled_pairs)} pairs; kept {len(carried)} listings from the rest")
+        self.save_listings()
+        self.listing_db.close()
+        self.geocode_cache.save()
+        if self.seen_store:
+            scope = set(self.crawled_pairs) if partial else None
+            print(self.seen_store.stats(scope))
+            for link in self.seen_store.disappeared(scope):
+                self.price_history.mark_gone(link)
+            self.seen_store.prune()
+            self.save_seen_store()
+        self.price_history.save()
+        print(self.price_history.stats())
+        print(f"Skipped {self.duplicates_skipped} duplicate cards before geocoding.")
+        print(f"Used source-provided coordinates for {self.geocodes_skipped} listings.")
+        print(self.geocode_cache.stats())
+        if self.local_geocoder:
+            print(self.local_geocoder.stats())
 
         self.generate_html()
         self.send_notifications()
 
     def generate_html(self):
-        listings_by_masjid = {}
-        for masjid in self.masjids:
-            listings_by_masjid[masjid['name']] = []
-
-        for listing in self.listings:
-            for match in listing['nearby_masjids']:
-                entry = listing.copy()
-                entry['dist_to_this_masjid'] = match['distance']
-                listings_by_masjid[match['name']].append(entry)
-
-        for name in listings_by_masjid:
-            listings_by_masjid[name].sort(key=lambda x: x['dist_to_this_masjid'])
-
-        html = f"""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Phoenix House Finder</title>
-            <style>
-                body {{ font-family: 'Segoe UI', sans-serif; background-color: #f3f4f6; color: #1f2937; margin: 0; padding: 20px; }}
-                h1 {{ text-align: center; color: #db2777; margin-bottom: 20px; }}
-                .status-bar {{ text-align: center; color: #6b7280; margin-bottom: 40px; font-size: 0.9em; }}
-                .masjid-section {{ margin: 40px auto; max-width: 1200px; }}
-                .masjid-title {{ font-size: 1.5em; color: #4b5563; border-left: 5px solid #db2777; padding-left: 15px; margin-bottom: 20px; font-weight: bold; background: white; padding: 10px 15px; border-radius: 0 8px 8px 0; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }}
-                .container {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(300px, 1fr)); gap: 25px; }}
-                .card {{ background: white; border-radius: 12px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.1); transition: transform 0.2s; display: flex; flex-direction: column; }}
-                .card:hover {{ transform: translateY(-4px); box-shadow: 0 10px 15px rgba(0,0,0,0.1); }}
-                .card img {{ width: 100%; height: 200px; object-fit: cover; }}
-                .card-content {{ padding: 20px; flex-grow: 1; display: flex; flex-direction: column; }}
-                .source-badge {{ font-size: 0.75em; text-transform: uppercase; font-weight: bold; color: #9ca3af; margin-bottom: 5px; }}
-                .price {{ font-size: 1.5em; color: #be185d; font-weight: 800; margin-bottom: 5px; }}
-                .address {{ color: #4b5563; font-size: 1.1em; line-height: 1.4; margin-bottom: 15px; }}
-                .dist-badge {{ align_self: flex-start; background: #e0f2fe; color: #0369a1; padding: 4px 10px; border-radius: 20px; font-size: 0.85em; font-weight: 600; margin-bottom: 15px; }}
-                .actions {{ margin-top: auto; display: grid; grid-template-columns: 1fr 1fr; gap: 10px; }}
-                .btn {{ padding: 10px; text-align: center; text-decoration: none; border-radius: 6px; font-weight: 600; font-size: 0.9em; transition: background 0.2s; }}
-                .btn-view {{ background: #f3f4f6; color: #374151; }}
-                .btn-view:hover {{ background: #e5e7eb; }}
-                .btn-wa {{ background: #22c55e; color: white; }}
-                .btn-wa:hover {{ background: #16a34a; }}
-            </style>
-        </head>
-        <body>
-            <h1>Compatible Homes Near Masjids</h1>
-            <div class="status-bar">Tracking {len(self.listings)} listings across {len(self.masjids)} Masjids</div>
-        """
-        
-        has_listings = False
-        for masjid_name, items in listings_by_masjid.items():
-            if not items:
-                continue
-            has_listings = True
-            html += f"""
-            <div class="masjid-section">
-                <div class="masjid-title">{masjid_name} · {len(items)} found</div>
-                <div class="container">
-            """
-            for item in items:
-                dist = item['dist_to_this_masjid']
-                wa_text = f"Check this house near {masjid_name} ({dist:.2f} mi): {item['address']} - {item['price']} - {item['link']}"
-                wa_link = f"https://wa.me/?text={wa_text}"
-                image_url = item.get('image', '')
-                if not image_url or "http" not in image_url:
-                    image_url = "https://via.placeholder.com/300x200?text=No+Image"
-
-                html += f"""
-                <div class="card">
-                    <img src="{image_url}" alt="Home">
-                    <div class="card-content">
-                        <div class="source-badge">{item['source']}</div>
-                        <div class="price">{item['price']}</div>
-                        <div class="address">{item['address']}</div>
-                        <div class="dist-badge">📍 {dist:.2f} miles away</div>
-                        <div class="actions">
-                            <a href="{item['link']}" target="_blank" class="btn btn-view">View details</a>
-                            <a href="{wa_link}" target="_blank" class="btn btn-wa">WhatsApp</a>
-                        </div>
-                    </div>
-                </div>
-                """
-            html += "</div></div>"
-            
-        if not has_listings:
-            html += '<div style="text-align:center; padding: 50px; color: #666;">No matching houses found in this run. Please try running the script again or check the browser for captchas.</div>'
-
-        html += """
-        </body>
-        </html>
-        """
-        with open(OUTPUT_HTML, 'w', encoding='utf-8') as f:
-            f.write(html)
-        print(f"Generated {OUTPUT_HTML} Grouped by Masjid.")
-
-    def send_notifications(self):
-        if not self.listings:
-            return
-
-        print(f"--- Sending Notifications for {len(self.listings)} listings ---")
-        
-        # WhatsApp Automation via TextMeBot API
+        # index.html plus masjids/<name>.html; pages whose listings didn't change are left untouched
+        if self.image_cache:
+            self.image_cache.close()
+            print(self.image_cache.stats())
+        site = render_site(self.listings, self.masjids, "Phoenix House Finder",
+                           "No matching houses found in this run. Please try running the script again or check the browser for captchas.",
+                           thumbs=load_thumbnail_map())
+        print(f"Generated {OUTPUT_HTML} Grouped by Masjid. {site.stats()}")
+
+    def send_notifications(self, latest=False):
+        # Only listings that are new, cheaper or changed since the last message go out;
+        # `latest` sends from the newest run in the store instead of this one
+        print("--- Sending Notifications ---")
+
+        # WhatsApp (TextMeBot, CallMeBot) and Telegram, every recipient concurrently
         try:
-            from textmebot_interface import send_textmebot_message
-            import os
             from dotenv import load_dotenv
-            
+
             load_dotenv()
-            
-            # --- CONFIGURATION FROM ENV ---
-            TEXTMEBOT_APIKEY = os.getenv("TEXTMEBOT_APIKEY")
-            TARGET_PHONE = os.getenv("TEXTMEBOT_TARGET")
-            
-            if not TEXTMEBOT_APIKEY:
-                print("⚠️ Error: TEXTMEBOT_APIKEY not found in .env file.")
+
+            channels = channels_from_env()
+            if not channels:
+                print("⚠️ Error: no notification channels configured in .env (e.g. TEXTMEBOT_APIKEY).")
                 return
 
-            # Group listings by Masjid
-            by_masjid = {}
-            for item in self.listings:
-                # nearby_masjids is a list of {'name':..., 'distance':...}
-                for masjid in item.get('nearby_masjids', []):
-                    m_name = masjid['name']
-                    if m_name not in by_masjid:
-                        by_masjid[m_name] = []
-                    
-                    # Store listing with specific distance for this masjid
-                    entry = item.copy()
-                    entry['sort_dist'] = masjid['distance']
-                    by_masjid[m_name].append(entry)
-            
-            # Sort Masjids alphabetically
-            sorted_masjids = sorted(by_masjid.keys())
-            
-            full_msg = f"🏠 Found {len(self.listings)} homes!\n"
-            
-            for m_name in sorted_masjids:
-                entries = by_masjid[m_name]
-                # Sort by distance
-                entries.sort(key=lambda x: x['sort_dist'])
-                
-                full_msg += f"\n🕋 *{m_name}* ({len(entries)})\n"
-                for entry in entries:
-                    dist = entry['sort_dist']
-                    price = entry['price']
-                    # Truncate address if too long
-                    addr = entry['address'][:30] + "..." if len(entry['address']) > 30 else entry['address']
-                    link = entry['link']
-                    full_msg += f"📍 {dist:.2f}mi | {price}\n{link}\n"
-            
-            full_msg += f"\nOpen http://localhost:8080 for full details."
-            full_msg += "\nSent automatically by Musaddique's Bot"
-
-            print(f"Sending via TextMeBot to Group ({TARGET_PHONE})...")
-            send_textmebot_message(TEXTMEBOT_APIKEY, TARGET_PHONE, full_msg)
-            
-        except ImportError:
-            print("Could not import textmebot_interface.")
+            print(f"Sending to {len(channels)} recipients...")
+            dispatcher = Dispatcher()
+            try:
+                dispatcher.notify_all(Notifier(self.listing_db), channels,
+                                      run_id=None if latest else self.listing_db.run_id)
+            finally:
+                dispatcher.close()
+            print(dispatcher.report.summary())
+
         except Exception as e:
-            print(f"WhatsApp send failed: {e}")
+            print(f"Notification send failed: {e}")
 
 if __name__ == "__main__":
     import sys
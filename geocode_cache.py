@@ -0,0 +1,115 @@
+import json
+import os
+import re
+import threading
+import time
+
+GEOCODE_CACHE_FILE = 'geocode_cache.json'
+# Successful lookups rarely change; failed ones are retried sooner in case the
+# geocoder's data improves or the failure was a bad address format.
+GEOCODE_CACHE_TTL_DAYS = 180
+GEOCODE_CACHE_NEGATIVE_TTL_DAYS = 14
+GEOCODE_CACHE_MAX_ENTRIES = 50000
+
+# Common spellings collapsed so "123 North 5th Street" and "123 N 5th St" share a key
+_ADDRESS_ABBREVIATIONS = {
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'drive': 'dr',
+    'lane': 'ln', 'boulevard': 'blvd', 'court': 'ct', 'place': 'pl',
+    'parkway': 'pkwy', 'circle': 'cir', 'terrace': 'ter', 'trail': 'trl',
+    'highway': 'hwy', 'arizona': 'az',
+}
+
+
+def normalize_address(address):
+    """
+    Returns a canonical form of an address for use as a lookup key.
+    Lowercases, strips punctuation and collapses common street abbreviations.
+    """
+    if not address:
+        return ""
+    text = address.lower().replace('#', ' unit ')
+    tokens = re.findall(r"[a-z0-9]+", text)
+    return " ".join(_ADDRESS_ABBREVIATIONS.get(t, t) for t in tokens)
+
+
+class GeocodeCache:
+    """
+    On-disk cache of geocoding results keyed by normalized address.
+    Entries are stored as [lat, lon, created_at, last_used_at]; a failed
+    lookup is stored with lat/lon set to None so it is not retried every run.
+    Safe to use from the geocode worker while the main thread saves.
+    """
+
+    def __init__(self, path=GEOCODE_CACHE_FILE, ttl_days=GEOCODE_CACHE_TTL_DAYS,
+                 negative_ttl_days=GEOCODE_CACHE_NEGATIVE_TTL_DAYS,
+                 max_entries=GEOCODE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: ignoring unreadable geocode cache {self.path}: {e}")
+            return {}
+
+    def get(self, address):
+        """
+        Returns (hit, (lat, lon)). A hit with (None, None) is a cached failure.
+        """
+        key = normalize_address(address)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                lat, lon, created_at, _ = entry
+                ttl = self.ttl if lat is not None else self.negative_ttl
+                if now - created_at <= ttl:
+                    entry[3] = now
+                    self.dirty = True
+                    self.hits += 1
+                    return True, (lat, lon)
+                del self.entries[key]
+            self.misses += 1
+        return False, (None, None)
+
+    def put(self, address, lat, lon):
+        now = time.time()
+        with self.lock:
+            self.entries[normalize_address(address)] = [lat, lon, now, now]
+            self.dirty = True
+            if len(self.entries) > self.max_entries:
+                self.evict()
+
+    def evict(self):
+        # Caller holds self.lock
+        # Drop the least recently used tenth so eviction isn't paid on every put
+        keep = int(self.max_entries * 0.9)
+        by_last_used = sorted(self.entries.items(), key=lambda kv: kv[1][3], reverse=True)
+        self.entries = dict(by_last_used[:keep])
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"Geocode cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {len(self.entries)} entries"
@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+
+# Nominatim's usage policy allows at most one request per second
+GEOCODE_REQUESTS_PER_SECOND = 1.0
+GEOCODE_QUEUE_SIZE = 500
+
+_STOP = object()
+
+
+class RateLimiter:
+    """
+    Spaces calls so no more than `per_second` of them start in any second.
+    Safe to share between threads.
+    """
+
+    def __init__(self, per_second=GEOCODE_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class GeocodeWorker:
+    """
+    Background geocoding stage. Scrapers submit raw cards and keep navigating;
+    a single worker thread resolves coordinates with `resolve(card)` and hands
+    the result to `on_result(card, lat, lon)` as soon as it is available.
+
+    The queue is bounded, so a scraper that gets far ahead of the geocoder
+    blocks on submit() instead of buffering an unbounded backlog.
+    """
+
+    def __init__(self, resolve, on_result, maxsize=GEOCODE_QUEUE_SIZE):
+        self.resolve = resolve
+        self.on_result = on_result
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = None
+        # Cards are submitted from several crawl threads; only one of them may start the worker
+        self.start_lock = threading.Lock()
+        self.processed = 0
+        self.busy_seconds = 0.0
+
+    def start(self):
+        with self.start_lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, name="geocode-worker", daemon=True)
+            self.thread.start()
+
+    def submit(self, card):
+        self.start()
+        self.queue.put(card)
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def stats(self, scrape_seconds=None):
+        line = f"Geocode worker: {self.processed} cards, {self.busy_seconds:.1f}s geocoding and matching"
+        if scrape_seconds:
+            line += f" against {scrape_seconds:.1f}s of scraping"
+        return line
+
+    def close(self):
+        """Waits for every queued card to be geocoded and matched, then stops the worker."""
+        if not self.thread:
+            return
+        if self.pending():
+            print(f"Waiting for {self.pending()} queued geocodes to finish...")
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.thread = None
+
+    def _run(self):
+        while True:
+            card = self.queue.get()
+            if card is _STOP:
+                break
+            started = time.monotonic()
+            try:
+                lat, lon = self.resolve(card)
+                self.on_result(card, lat, lon)
+            except Exception as e:
+                print(f"Geocode worker error for {card.get('address')}: {e}")
+            self.busy_seconds += time.monotonic() - started
+            self.processed += 1
@@ -0,0 +1,171 @@
+import sys
+
+import sources
+from sources import SOURCES, finish_records
+from structured_data import listings_from_blobs
+
+# selectolax (lexbor, C) parses a 400 KB results page ~40x faster than BeautifulSoup.
+# Both backends produce the same records; BeautifulSoup is the fallback.
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+
+class LexborBackend:
+    name = 'selectolax'
+
+    @staticmethod
+    def parse(html):
+        return LexborHTMLParser(html)
+
+    @staticmethod
+    def select(node, css):
+        return node.css(css)
+
+    @staticmethod
+    def select_one(node, css):
+        return node.css_first(css)
+
+    @staticmethod
+    def text(node):
+        # Approximates innerText: block children on their own lines, whitespace trimmed
+        return node.text(separator="\n", strip=True) if node else ""
+
+    @staticmethod
+    def attr(node, name):
+        return node.attributes.get(name) if node else None
+
+    @staticmethod
+    def first_text(node):
+        first = node.child
+        if first is None:
+            return ""
+        return first.text_content if first.tag == '-text' else first.text()
+
+
+class SoupBackend:
+    name = 'bs4'
+
+    @staticmethod
+    def parse(html):
+        from bs4 import BeautifulSoup
+        try:
+            return BeautifulSoup(html, 'lxml')
+        except Exception:
+            return BeautifulSoup(html, 'html.parser')
+
+    @staticmethod
+    def select(node, css):
+        return node.select(css)
+
+    @staticmethod
+    def select_one(node, css):
+        return node.select_one(css)
+
+    @staticmethod
+    def text(node):
+        return node.get_text("\n", strip=True) if node else ""
+
+    @staticmethod
+    def attr(node, name):
+        return node.get(name) if node else None
+
+    @staticmethod
+    def first_text(node):
+        first = node.contents[0] if node.contents else None
+        return first.get_text() if hasattr(first, 'get_text') else str(first or "")
+
+
+DEFAULT_BACKEND = LexborBackend if HAS_SELECTOLAX else SoupBackend
+
+
+def parse_realtor(b, root):
+    records = []
+    for card in b.select(root, 'div[data-testid="property-card"]'):
+        address_el = b.select_one(card, '[data-testid="card-address"]')
+        parts = [b.text(el) for el in b.select(address_el, '[data-testid]')] if address_el else []
+        record = {
+            'address': ", ".join(parts) if parts else b.text(address_el).replace("\n", ", "),
+            'price': b.text(b.select_one(card, '[data-testid="card-price"]')),
+            'link': b.attr(b.select_one(card, 'a[href^="/realestateandhomes-detail"]'), 'href') or "",
+            'image': b.attr(b.select_one(card, 'img'), 'src') or "",
+        }
+        if record['address'] and record['price']:
+            records.append(record)
+    return records
+
+
+def parse_fsbo(b, root):
+    cards = b.select(root, 'div[class*="card-"]') or b.select(root, 'div.shadow.rounded-lg.relative.flex')
+    records = []
+    for card in cards:
+        # Street address is the first text node of the link; the city/state is in a child span
+        link_el = b.select_one(card, 'a[href^="/listing/"]')
+        if not link_el:
+            continue
+        price_el = next((el for el in b.select(card, 'span.text-xl') if '$' in b.text(el)), None)
+        records.append({
+            'address': b.first_text(link_el).strip(),
+            'price': b.text(price_el) or "N/A",
+            'link': b.attr(link_el, 'href'),
+            'image': b.attr(b.select_one(card, 'img'), 'src') or "",
+        })
+    return records
+
+
+def parse_homes_com(b, root):
+    cards = b.select(root, 'article[data-testid="listing-card"]') or b.select(root, '.placards-list ul li article')
+    records = []
+    for card in cards:
+        price_el = b.select_one(card, '.price-container')
+        name_el = b.select_one(card, '.property-name')
+        link = b.attr(b.select_one(card, 'a'), 'href')
+        if not price_el or not name_el or not link:
+            continue
+        records.append({
+            'address': b.text(name_el),
+            'price': b.text(price_el),
+            'link': link,
+            'image': b.attr(b.select_one(card, 'img'), 'src') or "",
+        })
+    return records
+
+
+PARSERS = {
+    'Realtor.com': parse_realtor,
+    'ForSaleByOwner': parse_fsbo,
+    'Homes.com': parse_homes_com,
+}
+
+
+def parse_html(source, html, page_url="", backend=None, mode=None):
+    """
+    Parses a saved results page into the same records sources.extract_cards
+    returns live: structured data first (with lat/lon), else the DOM cards.
+    `mode` overrides sources.EXTRACTION_MODE ('auto', 'structured' or 'dom').
+    """
+    b = backend or DEFAULT_BACKEND
+    mode = mode or sources.EXTRACTION_MODE
+    root = b.parse(html)
+    if mode != 'dom':
+        blobs = [b.text(el) for el in b.select(root, 'script[type="application/ld+json"], script#__NEXT_DATA__')]
+        records = listings_from_blobs(blobs)
+        if records or mode == 'structured':
+            return finish_records(source, records, page_url)
+    return finish_records(source, PARSERS[source](b, root), page_url)
+
+
+def parse_file(source, path, page_url="", backend=None):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_html(source, f.read(), page_url, backend)
+
+
+if __name__ == "__main__":
+    # Usage: python html_parsers.py <source> <saved_page.html>
+    if len(sys.argv) != 3 or sys.argv[1] not in SOURCES:
+        print(f"Usage: python html_parsers.py <{'|'.join(SOURCES)}> <saved_page.html>")
+        sys.exit(1)
+    for record in parse_file(sys.argv[1], sys.argv[2]):
+        print(f"{record['price']:>12} | {record['address']} | {record['link']}")
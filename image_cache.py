@@ -0,0 +1,159 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from PIL import Image, ImageOps, features
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+    print("Notice: Pillow not installed, listing photos will be hotlinked instead of cached.")
+
+IMAGE_CACHE_DIR = 'thumbs'
+IMAGE_FETCH_WORKERS = 4
+IMAGE_FETCH_TIMEOUT = 15
+MAX_IMAGE_BYTES = 15_000_000
+# 2x the card's 300x200 image box, so thumbnails stay sharp on phones
+THUMB_SIZE = (600, 400)
+THUMB_QUALITY = 70
+# Photos that failed to download are retried after this long
+IMAGE_RETRY_SECONDS = 86400
+
+
+def _thumb_format():
+    return ('WEBP', '.webp') if HAS_PIL and features.check('webp') else ('JPEG', '.jpg')
+
+
+def load_thumbnail_map(cache_dir=IMAGE_CACHE_DIR):
+    """{image url: 'thumbs/<hash>.webp'} for every cached photo; read-only, for the page generators."""
+    try:
+        with open(os.path.join(cache_dir, 'index.json'), 'r') as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return {url: f"{cache_dir}/{entry['file']}" for url, entry in index.items() if entry.get('file')}
+
+
+class ImageCache:
+    """
+    Content-addressed cache of listing photos. Each image URL is fetched once
+    on a small thread pool, shrunk to a THUMB_SIZE thumbnail and stored as
+    thumbs/<sha1 of the original bytes>.webp, so the same photo reached
+    through different URLs (or listed by two sources) is stored once.
+    thumbs/index.json maps URLs to files and remembers failures so they
+    aren't retried every run.
+
+    request() only queues the URL, so the scrape never waits on an image
+    download; close() waits for outstanding fetches before the page is built.
+    """
+
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, workers=IMAGE_FETCH_WORKERS):
+        self.cache_dir = cache_dir
+        self.format, self.extension = _thumb_format()
+        self.lock = threading.Lock()
+        self.index = self.load()
+        self.queued = set()
+        self.fetched = 0
+        self.deduped = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-fetch")
+        from browser_setup import FIXED_USER_AGENT
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = FIXED_USER_AGENT
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=workers))
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=workers))
+
+    def load(self):
+        try:
+            with open(os.path.join(self.cache_dir, 'index.json'), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: ignoring unreadable image index in {self.cache_dir}: {e}")
+            return {}
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, 'index.json')
+        with self.lock:
+            with open(path + '.tmp', 'w') as f:
+                json.dump(self.index, f, separators=(',', ':'))
+            os.replace(path + '.tmp', path)
+
+    def request(self, url):
+        """Queues `url` for download unless it is cached, queued, or failed recently."""
+        if not HAS_PIL or not url or not url.startswith(('http://', 'https://')):
+            return
+        with self.lock:
+            entry = self.index.get(url)
+            if entry and (entry.get('file') or time.time() - entry['failed_at'] < IMAGE_RETRY_SECONDS):
+                return
+            if url in self.queued:
+                return
+            self.queued.add(url)
+        self.pool.submit(self._fetch, url)
+
+    def _fetch(self, url):
+        try:
+            response = self.session.get(url, timeout=IMAGE_FETCH_TIMEOUT, stream=True)
+            response.raise_for_status()
+            data = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+            if len(data) > MAX_IMAGE_BYTES:
+                raise ValueError("image too large")
+            name = hashlib.sha1(data).hexdigest()[:20] + self.extension
+            path = os.path.join(self.cache_dir, name)
+            if os.path.exists(path):
+                with self.lock:
+                    self.deduped += 1
+            else:
+                thumb = self._thumbnail(data)
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(thumb)
+                os.replace(path + '.tmp', path)
+                with self.lock:
+                    self.bytes_in += len(data)
+                    self.bytes_out += len(thumb)
+            with self.lock:
+                self.index[url] = {'file': name}
+                self.fetched += 1
+        except Exception as e:
+            with self.lock:
+                self.index[url] = {'file': None, 'failed_at': time.time()}
+                self.failed += 1
+            print(f"  Image fetch failed for {url}: {e}")
+        finally:
+            with self.lock:
+                self.queued.discard(url)
+
+    def _thumbnail(self, data):
+        image = Image.open(io.BytesIO(data))
+        image.draft('RGB', THUMB_SIZE) # JPEGs decode straight at a reduced scale
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image = ImageOps.fit(image, THUMB_SIZE, Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, self.format, quality=THUMB_QUALITY)
+        return out.getvalue()
+
+    def close(self):
+        """Waits for queued downloads, then saves the index."""
+        if self.queued:
+            print(f"Waiting for {len(self.queued)} listing photos to download...")
+        self.pool.shutdown(wait=True)
+        self.session.close()
+        self.save()
+
+    def stats(self):
+        saved = (1 - self.bytes_out / self.bytes_in) * 100 if self.bytes_in else 0.0
+        return (f"Image cache: {self.fetched} fetched ({self.deduped} duplicates), {self.failed} failed, "
+                f"thumbnails {saved:.0f}% smaller than originals")
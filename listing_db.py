@@ -0,0 +1,200 @@
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from listing_keys import canonical_link
+
+LISTINGS_DB_FILE = 'listings.db'
+LISTINGS_FILE = 'listings.json'
+# Upserts queued while a transaction is running are committed together in the next one
+WRITE_BATCH_SIZE = 200
+
+_STOP = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    link TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    run INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    updated REAL NOT NULL,
+    changed REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS listings_run ON listings (run);
+"""
+
+# The change feed: when a row's data last differed from what was stored
+CHANGE_INDEX = "CREATE INDEX IF NOT EXISTS listings_changed ON listings (changed)"
+
+UPSERT = """
+INSERT INTO listings (link, data, run, first_seen, updated, changed) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (link) DO UPDATE SET data = excluded.data, run = excluded.run, updated = excluded.updated,
+    changed = CASE WHEN listings.data = excluded.data THEN listings.changed ELSE excluded.changed END
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    # WAL lets the exporter read while the writer commits
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(listings)")]
+    if 'changed' not in columns: # Stores created before the change feed existed
+        conn.execute("ALTER TABLE listings ADD COLUMN changed REAL NOT NULL DEFAULT 0")
+    conn.execute(CHANGE_INDEX)
+    return conn
+
+
+class ListingDB:
+    """
+    Durable listing store: one SQLite row per canonical link, upserted as
+    matches are found. Each listing is tagged with the run that last saw it
+    and the time its data last changed (the change feed, see changes_since).
+
+    Writes go through a background thread that commits queued upserts in
+    batches, so scrapers and the geocode worker never wait on disk, and a
+    crash loses at most the batch in flight rather than corrupting the file.
+    export_json() writes the listings.json that update_html.py reads;
+    notifications read the change feed here directly.
+    """
+
+    def __init__(self, path=LISTINGS_DB_FILE, run_id=None):
+        self.path = path
+        self.run_id = run_id if run_id is not None else int(time.time())
+        self.queue = queue.Queue()
+        self.thread = None
+        # Upserts arrive from several threads; only one of them may start the writer
+        self.start_lock = threading.Lock()
+        self.written = 0
+        self.commits = 0
+
+    def start(self):
+        with self.start_lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, name="listing-writer", daemon=True)
+            self.thread.start()
+
+    def upsert(self, listing):
+        self.start()
+        self.queue.put((canonical_link(listing['link']), json.dumps(listing), time.time()))
+
+    def flush(self):
+        """Blocks until every queued upsert is committed."""
+        if self.thread:
+            self.queue.join()
+
+    def close(self):
+        if not self.thread:
+            return
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.thread = None
+
+    def _run(self):
+        conn = connect(self.path)
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _STOP:
+                stopping = True
+            rows = [(link, data, self.run_id, now, now, now)
+                    for link, data, now in (item for item in batch if item is not _STOP)]
+            try:
+                with conn: # One transaction per batch
+                    conn.executemany(UPSERT, rows)
+                self.written += len(rows)
+                self.commits += 1
+            except sqlite3.Error as e:
+                print(f"Listing store write failed ({len(rows)} listings): {e}")
+            for _ in batch:
+                self.queue.task_done()
+        conn.close()
+
+    def listings(self, run_id=None):
+        """Listings last seen by `run_id`; defaults to the most recent run in the store."""
+        if not os.path.exists(self.path):
+            return []
+        conn = connect(self.path)
+        try:
+            if run_id is None:
+                run_id = conn.execute("SELECT MAX(run) FROM listings").fetchone()[0]
+            rows = conn.execute("SELECT data FROM listings WHERE run = ? ORDER BY rowid", (run_id,))
+            return [json.loads(data) for (data,) in rows]
+        finally:
+            conn.close()
+
+    def changes_since(self, since, run_id=None):
+        """
+        Listings of `run_id` (default: the latest run) that are new or whose
+        data changed after the timestamp `since`, with the time of the newest
+        change: (listings, latest_changed). Served from the index on `changed`,
+        so the cost follows the number of changes, not the inventory.
+        """
+        self.flush()
+        if not os.path.exists(self.path):
+            return [], since
+        conn = connect(self.path)
+        try:
+            if run_id is None:
+                run_id = conn.execute("SELECT MAX(run) FROM listings").fetchone()[0]
+            rows = conn.execute("SELECT data, changed FROM listings WHERE changed > ? AND run = ? ORDER BY changed",
+                                (since, run_id)).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(data) for data, _ in rows], max((changed for _, changed in rows), default=since)
+
+    def carry_forward(self, crawled_pairs):
+        """
+        After a run that crawled only `crawled_pairs`, moves the listings the
+        previous run had under every other (city, source) into this run, so
+        listings(run_id) is still the whole inventory. Their `changed` time is
+        kept, so they don't show up in the change feed again. Returns them.
+        """
+        self.flush()
+        if not os.path.exists(self.path):
+            return []
+        crawled = set(crawled_pairs)
+        conn = connect(self.path)
+        try:
+            previous = conn.execute("SELECT MAX(run) FROM listings WHERE run < ?", (self.run_id,)).fetchone()[0]
+            if previous is None:
+                return []
+            carried = []
+            for (data,) in conn.execute("SELECT data FROM listings WHERE run = ? ORDER BY rowid", (previous,)):
+                listing = json.loads(data)
+                if (listing.get('city'), listing.get('source')) not in crawled:
+                    carried.append(listing)
+            with conn:
+                conn.executemany("UPDATE listings SET run = ? WHERE link = ?",
+                                 [(self.run_id, canonical_link(listing['link'])) for listing in carried])
+        finally:
+            conn.close()
+        return carried
+
+    def export_json(self, path=LISTINGS_FILE, run_id=None):
+        """Writes listings.json atomically from the store. Returns the number of listings written."""
+        self.flush()
+        listings = self.listings(run_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(listings, f, indent=4)
+        os.replace(tmp_path, path)
+        return len(listings)
+
+
+if __name__ == "__main__":
+    # Usage: python listing_db.py [listings.json]  (re-exports the latest run)
+    target = sys.argv[1] if len(sys.argv) > 1 else LISTINGS_FILE
+    count = ListingDB().export_json(target)
+    print(f"Exported {count} listings from {LISTINGS_DB_FILE} to {target}")
@@ -0,0 +1,47 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from geocode_cache import normalize_address
+from local_geocoder import parse_address
+
+# Query parameters that only track where a click came from
+TRACKING_PARAM_PREFIXES = ('utm_', 'mc_', 'pk_')
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'dclid', 'yclid', 'ref', 'ref_', 'referrer',
+                   'source', 'from', 'cid', 'sid', 'trk', 'tracking', 'spm', 'ex_cid'}
+
+
+def canonical_link(link):
+    """
+    Returns a stable form of a listing URL so the same listing reached through
+    different links (tracking params, param order, www., trailing slash,
+    fragment) produces the same key.
+    """
+    if not link:
+        return ""
+    parts = urlsplit(link.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/') or '/'
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+def address_key(address, city=None):
+    """
+    Returns the normalized street line and city ("123 n 5th st|chandler") used
+    to spot the same house listed by a different source or found by another
+    city's search. The city comes from the address when it has one, else from
+    `city` (the search city), so 123 N Main St in Chandler and in Mesa stay
+    apart. Returns "" when the address has no house number to anchor on, so
+    only the link is used to dedupe it.
+    """
+    if not address:
+        return ""
+    parsed = parse_address(address)
+    if not parsed:
+        return ""
+    number, street, address_city = parsed
+    return f"{number} {street}|{address_city or normalize_address(city)}"
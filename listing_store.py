@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from listing_keys import canonical_link
+
+SEEN_LISTINGS_FILE = 'seen_listings.json'
+# Listings not seen for this long are dropped from the store
+SEEN_LISTINGS_RETENTION_DAYS = 30
+
+
+def listing_fingerprint(address, price, image):
+    """Hash of the card fields that, when changed, mean the listing must be processed again."""
+    text = "\x1f".join((address or "", price or "", image or ""))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def catalog_fingerprint(masjids, radius):
+    """Changes whenever masjids.json or the search radius does, invalidating stored matches."""
+    text = json.dumps([radius, [[m['name'], m['lat'], m['lon']] for m in masjids]])
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class SeenListingStore:
+    """
+    Persistent record of every listing processed by earlier runs, keyed by
+    canonical link. Each entry keeps the card fingerprint, coordinates and
+    masjid matches, so a listing whose card hasn't changed is reused as-is
+    instead of being geocoded and matched again.
+
+    classify() sorts each card of the current run into new / changed /
+    unchanged; entries not seen by the end of the run are counted as
+    disappeared. Safe to use from the geocode worker while the main thread
+    classifies cards.
+    """
+
+    def __init__(self, path=SEEN_LISTINGS_FILE, retention_days=SEEN_LISTINGS_RETENTION_DAYS):
+        self.path = path
+        self.retention = retention_days * 86400
+        self.lock = threading.Lock()
+        self.run_started = time.time()
+        self.counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+        self.dirty = False
+        data = self.load()
+        self.catalog = data.get('catalog')
+        self.entries = data.get('listings', {})
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: ignoring unreadable listing store {self.path}: {e}")
+            return {}
+
+    def stale_matches(self, catalog):
+        """True when stored matches were computed against a different masjid catalog."""
+        return bool(self.entries) and self.catalog != catalog
+
+    def rematched(self, catalog, listings):
+        """Stores matches recomputed for `catalog` (see HouseFinder.rematch_listings)."""
+        with self.lock:
+            for listing in listings:
+                entry = self.entries.get(canonical_link(listing['link']))
+                if entry:
+                    entry['nearby_masjids'] = listing['nearby_masjids']
+            self.catalog = catalog
+            self.dirty = True
+
+    def classify(self, card):
+        """
+        Returns ('new' | 'changed' | 'unchanged', stored entry or None) for a
+        card and marks the listing as seen in this run.
+        """
+        fingerprint = listing_fingerprint(card['address'], card['price'], card['image'])
+        with self.lock:
+            entry = self.entries.get(canonical_link(card['link']))
+            if entry is None:
+                status = 'new'
+            elif entry['fingerprint'] != fingerprint:
+                status = 'changed'
+            else:
+                status = 'unchanged'
+                entry['last_seen'] = self.run_started
+                self.dirty = True
+            self.counts[status] += 1
+            return status, entry
+
+    def record(self, card, lat, lon, nearby_masjids):
+        """
+        Stores the outcome of geocoding and matching a card. Failed geocodes are
+        stored too (lat/lon None) and retried next run; the geocode cache keeps
+        that retry cheap.
+        """
+        now = time.time()
+        with self.lock:
+            key = canonical_link(card['link'])
+            previous = self.entries.get(key, {})
+            self.entries[key] = {
+                'fingerprint': listing_fingerprint(card['address'], card['price'], card['image']),
+                'link': card['link'],
+                'address': card['address'],
+                'price': card['price'],
+                'image': card['image'],
+                'source': card['source'],
+                'city': card['city'],
+                'lat': lat,
+                'lon': lon,
+                'nearby_masjids': nearby_masjids,
+                'first_seen': previous.get('first_seen', now),
+                'last_seen': self.run_started,
+            }
+            self.dirty = True
+
+    def listing(self, key):
+        """The stored entry in the shape of a listings.json record."""
+        entry = self.entries[key]
+        return {
+            'address': entry['address'],
+            'price': entry['price'],
+            # Entries from before links were kept as scraped only have the key
+            'link': entry.get('link', key),
+            'image': entry['image'],
+            'source': entry['source'],
+            'nearby_masjids': entry['nearby_masjids'],
+            'city': entry['city'],
+            'lat': entry['lat'],
+            'lon': entry['lon'],
+        }
+
+    def all_listings(self):
+        with self.lock:
+            return [self.listing(link) for link in self.entries]
+
+    def disappeared(self, pairs=None):
+        """
+        Links seen by an earlier run but not by this one. With `pairs`, only
+        listings last found under one of those (city, source) pairs count, for
+        runs that crawled just part of the search.
+        """
+        with self.lock:
+            return [link for link, entry in self.entries.items() if entry['last_seen'] < self.run_started
+                    and (pairs is None or (entry['city'], entry['source']) in pairs)]
+
+    def prune(self):
+        cutoff = self.run_started - self.retention
+        with self.lock:
+            expired = [link for link, entry in self.entries.items() if entry['last_seen'] < cutoff]
+            for link in expired:
+                del self.entries[link]
+            if expired:
+                self.dirty = True
+        return len(expired)
+
+    def save(self, catalog):
+        with self.lock:
+            if not self.dirty and self.catalog == catalog:
+                return
+            self.catalog = catalog
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'catalog': catalog, 'listings': self.entries}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def stats(self, pairs=None):
+        c = self.counts
+        return (f"Listing store: {c['new']} new, {c['changed']} changed, {c['unchanged']} unchanged, "
+                f"{len(self.disappeared(pairs))} disappeared, {len(self.entries)} stored")
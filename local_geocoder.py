@@ -0,0 +1,241 @@
+import bisect
+import csv
+import difflib
+import json
+import os
+from array import array
+
+from geocode_cache import normalize_address
+
+# Local address-point export (county CSV or GeoJSON). Missing file = no local geocoding.
+ADDRESS_POINTS_FILE = os.getenv('ADDRESS_POINTS_FILE', 'address_points.csv')
+# Applies to the street name only; direction, street type and numbered streets must match exactly
+FUZZY_STREET_THRESHOLD = 0.85
+# How far off a house number may be and still snap to the nearest known point on the street
+HOUSE_NUMBER_TOLERANCE = 50
+
+STREET_TYPES = {'st', 'ave', 'rd', 'dr', 'ln', 'blvd', 'ct', 'pl', 'pkwy', 'cir',
+                'ter', 'trl', 'hwy', 'way', 'loop', 'aly', 'path', 'run', 'pass'}
+DIRECTIONS = {'n', 's', 'e', 'w', 'ne', 'nw', 'se', 'sw'}
+UNIT_MARKERS = {'unit', 'apt', 'ste', 'suite', 'lot', 'spc'}
+
+# Column names seen in county address-point exports (matched case-insensitively)
+ADDRESS_FIELDS = ('address', 'full_address', 'fulladdr', 'full_addr', 'site_address', 'situs_address')
+NUMBER_FIELDS = ('add_number', 'addnum', 'house_number', 'housenumber', 'number', 'st_num', 'hse_nbr')
+PREDIR_FIELDS = ('st_predir', 'predir', 'prefix', 'st_prefix', 'dir_prefix')
+STREET_FIELDS = ('street', 'st_name', 'street_name', 'stname', 'road')
+TYPE_FIELDS = ('st_postyp', 'st_type', 'street_type', 'suffix', 'sttype')
+POSTDIR_FIELDS = ('st_posdir', 'postdir', 'dir_suffix')
+CITY_FIELDS = ('city', 'place_name', 'municipality', 'post_comm', 'postal_city')
+LAT_FIELDS = ('lat', 'latitude', 'y')
+LON_FIELDS = ('lon', 'lng', 'long', 'longitude', 'x')
+
+
+def parse_address(address):
+    """
+    Splits an address into (house_number, street_key, city_key).
+    Returns None when there is no leading house number to anchor on.
+    """
+    parts = address.split(',')
+    tokens = normalize_address(parts[0]).split()
+    city_tokens = normalize_address(parts[1]).split() if len(parts) > 1 else []
+
+    if len(parts) == 1:
+        # "123 N 5th St Phoenix AZ 85004": the street ends at the last street type
+        type_positions = [i for i, t in enumerate(tokens) if i > 0 and t in STREET_TYPES]
+        if type_positions:
+            end = type_positions[-1] + 1
+            tokens, city_tokens = tokens[:end], tokens[end:]
+
+    for i, token in enumerate(tokens):
+        if token in UNIT_MARKERS:
+            tokens = tokens[:i]
+            break
+
+    if len(tokens) < 2 or not tokens[0].isdigit():
+        return None
+    city_tokens = [t for t in city_tokens if t != 'az' and not t.isdigit()]
+    return int(tokens[0]), " ".join(tokens[1:]), " ".join(city_tokens)
+
+
+def _core_tokens(street):
+    return [t for t in street.split() if t not in DIRECTIONS and t not in STREET_TYPES]
+
+
+def _street_parts(street):
+    """
+    Splits a street key into its exact parts (directions, street types,
+    numbered tokens like "5th") and the name left over. E vs W Camelback or
+    5th vs 6th St are miles apart in a grid city, so only the name is fuzzy.
+    """
+    tokens = street.split()
+    directions = tuple(t for t in tokens if t in DIRECTIONS)
+    types = tuple(t for t in tokens if t in STREET_TYPES)
+    numbered = tuple(t for t in tokens if any(c.isdigit() for c in t))
+    name = " ".join(t for t in tokens if t not in DIRECTIONS and t not in STREET_TYPES
+                    and not any(c.isdigit() for c in t))
+    return (directions, types, numbered), name
+
+
+def _prefix_key(core):
+    # Joined so "mc dowell" and "mcdowell" land in the same bucket
+    return "".join(core)[:3]
+
+
+def _pick(row, fields):
+    for field in fields:
+        value = row.get(field)
+        if value not in (None, ''):
+            return str(value).strip()
+    return ''
+
+
+class LocalGeocoder:
+    """
+    In-memory geocoder over a local address-point file.
+
+    Points are kept in flat arrays (house number, lat, lon, city id); each
+    distinct street maps to its point ids sorted by house number. Streets are
+    also indexed by core token and by 3-letter prefix so a misspelt or
+    differently abbreviated street name can be matched fuzzily without
+    scanning every street; its direction, type and number must match exactly.
+    """
+
+    def __init__(self):
+        self.numbers = array('i')
+        self.lats = array('d')
+        self.lons = array('d')
+        self.city_ids = array('i')
+        self.cities = []
+        self.city_lookup = {}
+        self.streets = {}          # street key -> list of point ids, sorted by number
+        self.token_index = {}      # core token -> set of street keys
+        self.prefix_index = {}     # first 3 chars of the street's core name -> set of street keys
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_file(cls, path=ADDRESS_POINTS_FILE):
+        """Loads a CSV or GeoJSON export. Returns None if the file does not exist."""
+        if not path or not os.path.exists(path):
+            return None
+        geocoder = cls()
+        if path.lower().endswith(('.geojson', '.json')):
+            geocoder.load_geojson(path)
+        else:
+            geocoder.load_csv(path)
+        geocoder.finalize()
+        print(f"Loaded {len(geocoder.numbers)} address points ({len(geocoder.streets)} streets) from {path}")
+        return geocoder
+
+    def load_csv(self, path):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                self.add_row({k.strip().lower(): v for k, v in row.items() if k}, None, None)
+
+    def load_geojson(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for feature in data.get('features', []):
+            geometry = feature.get('geometry') or {}
+            props = {k.lower(): v for k, v in (feature.get('properties') or {}).items()}
+            lat = lon = None
+            if geometry.get('type') == 'Point':
+                lon, lat = geometry['coordinates'][:2]
+            self.add_row(props, lat, lon)
+
+    def add_row(self, row, lat, lon):
+        try:
+            lat = float(lat if lat is not None else _pick(row, LAT_FIELDS))
+            lon = float(lon if lon is not None else _pick(row, LON_FIELDS))
+        except ValueError:
+            return
+
+        full = _pick(row, ADDRESS_FIELDS)
+        if not full:
+            full = " ".join(p for p in (
+                _pick(row, NUMBER_FIELDS), _pick(row, PREDIR_FIELDS), _pick(row, STREET_FIELDS),
+                _pick(row, TYPE_FIELDS), _pick(row, POSTDIR_FIELDS)) if p)
+        city = _pick(row, CITY_FIELDS)
+        if city:
+            full = f"{full}, {city}"
+        parsed = parse_address(full)
+        if not parsed:
+            return
+        number, street, city_key = parsed
+        self.add_point(number, street, city_key, lat, lon)
+
+    def add_point(self, number, street, city_key, lat, lon):
+        city_id = self.city_lookup.get(city_key)
+        if city_id is None:
+            city_id = self.city_lookup[city_key] = len(self.cities)
+            self.cities.append(city_key)
+
+        point_id = len(self.numbers)
+        self.numbers.append(number)
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self.city_ids.append(city_id)
+
+        if street not in self.streets:
+            self.streets[street] = []
+            core = _core_tokens(street)
+            for token in core:
+                self.token_index.setdefault(token, set()).add(street)
+            if core:
+                self.prefix_index.setdefault(_prefix_key(core), set()).add(street)
+        self.streets[street].append(point_id)
+
+    def finalize(self):
+        numbers = self.numbers
+        for point_ids in self.streets.values():
+            point_ids.sort(key=numbers.__getitem__)
+
+    def match_street(self, street):
+        if street in self.streets:
+            return street
+        core = _core_tokens(street)
+        candidates = set()
+        for token in core:
+            candidates |= self.token_index.get(token, set())
+        if core:
+            candidates |= self.prefix_index.get(_prefix_key(core), set())
+        exact, name = _street_parts(street)
+        best, best_score = None, FUZZY_STREET_THRESHOLD
+        for candidate in candidates:
+            candidate_exact, candidate_name = _street_parts(candidate)
+            if candidate_exact != exact:
+                continue
+            score = difflib.SequenceMatcher(None, name, candidate_name).ratio()
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def geocode(self, address):
+        """Returns (lat, lon) for the address, or None if it can't be matched locally."""
+        parsed = parse_address(address)
+        street = self.match_street(parsed[1]) if parsed else None
+        if not street:
+            self.misses += 1
+            return None
+        number, _, city_key = parsed
+
+        point_ids = self.streets[street]
+        city_id = self.city_lookup.get(city_key)
+        if city_id is not None:
+            # Same street name exists in several cities; stay in the requested one if we can
+            in_city = [p for p in point_ids if self.city_ids[p] == city_id]
+            point_ids = in_city or point_ids
+
+        keys = [self.numbers[p] for p in point_ids]
+        i = bisect.bisect_left(keys, number)
+        nearest = min((j for j in (i - 1, i) if 0 <= j < len(keys)), key=lambda j: abs(keys[j] - number))
+        if abs(keys[nearest] - number) > HOUSE_NUMBER_TOLERANCE:
+            self.misses += 1
+            return None
+        self.hits += 1
+        point_id = point_ids[nearest]
+        return self.lats[point_id], self.lons[point_id]
+
+    def stats(self):
+        return f"Local geocoder: {self.hits} hits, {self.misses} misses"
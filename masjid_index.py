@@ -0,0 +1,237 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3958.8
+# Conservative miles per degree; used to size grid cells so a radius never spans more cells than expected
+MILES_PER_DEG_LAT = 68.7
+MILES_PER_DEG_LON_EQUATOR = 69.17
+# Max listings x masjids cells per temporary distance block (~16 MB of float64)
+MATCH_BLOCK_CELLS = 2_000_000
+# Below this many masjids a full distance matrix is cheaper than bucketing; bench_masjid_index.py
+# puts the crossover for one listing at a time (how HouseFinder matches) between 300 and 1000
+GRID_MIN_CATALOG = 1000
+# The nearest-masjid search widens its ring of cells until it spans this many cells, then scans everything
+NEAREST_MAX_CELLS = 4096
+
+
+def distance_matrix(lats, lons, target_lats, target_lons):
+    """
+    Great-circle distances in miles between every (lats[i], lons[i]) and every
+    (target_lats[j], target_lons[j]). Returns an array of shape (len(lats), len(target_lats)).
+    """
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(lons, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(target_lats, dtype=np.float64))[None, :]
+    lon2 = np.radians(np.asarray(target_lons, dtype=np.float64))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def pair_distances(lats, lons, target_lats, target_lons):
+    """Great-circle distances in miles between (lats[i], lons[i]) and (target_lats[i], target_lons[i])."""
+    lat1, lon1 = np.radians(lats), np.radians(lons)
+    lat2, lon2 = np.radians(target_lats), np.radians(target_lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _cell_key(rows, cols):
+    return (rows << 32) + (cols + (1 << 31))
+
+
+class GridIndex:
+    """
+    Buckets points into square lat/lon cells one search radius tall, so a
+    radius query only has to look at the cells around the query point.
+
+    Points are stored sorted by cell, with each occupied cell's key, start and
+    count in flat arrays, so the candidates for a whole batch of queries are
+    gathered with array operations rather than a loop over cells.
+    """
+
+    def __init__(self, lats, lons, radius_miles):
+        self.radius = radius_miles
+        self.cell = radius_miles / MILES_PER_DEG_LAT
+        rows, cols = self._cells(lats, lons)
+        keys = _cell_key(rows, cols)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys, self.starts, self.counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+        self.offsets = {} # (row span, column span) -> flattened cell offsets around a query's cell
+        # Single listings look their cells up here; numpy's per-call overhead dominates at that size
+        self.slots = {key: (int(start), int(start + count))
+                      for key, start, count in zip(self.keys.tolist(), self.starts, self.counts)}
+
+    def _cells(self, lats, lons):
+        rows = np.floor(np.asarray(lats, dtype=np.float64) / self.cell).astype(np.int64)
+        cols = np.floor(np.asarray(lons, dtype=np.float64) / self.cell).astype(np.int64)
+        return rows, cols
+
+    def _col_spans(self, rows, row_span, reach_miles):
+        # Widest longitude span is at the cell edge farthest from the equator
+        edge_lat = np.maximum(np.abs((rows - row_span) * self.cell), np.abs((rows + row_span + 1) * self.cell))
+        cos_lat = np.maximum(np.cos(np.radians(np.minimum(edge_lat, 89.0))), 1e-6)
+        return np.ceil(reach_miles / (MILES_PER_DEG_LON_EQUATOR * cos_lat) / self.cell).astype(np.int64)
+
+    def _offsets(self, row_span, col_span):
+        key = (row_span, col_span)
+        if key not in self.offsets:
+            d_rows, d_cols = np.meshgrid(np.arange(-row_span, row_span + 1), np.arange(-col_span, col_span + 1), indexing='ij')
+            self.offsets[key] = (d_rows.ravel(), d_cols.ravel(), np.abs(d_cols.ravel()))
+        return self.offsets[key]
+
+    def pairs(self, lats, lons, reach_miles):
+        """
+        (query index, point id) for every point in a cell that could be within
+        `reach_miles` of the query. Points farther than that may be included.
+        """
+        if len(lats) == 1:
+            return self._pairs_one(float(lats[0]), float(lons[0]), reach_miles)
+        rows, cols = self._cells(lats, lons)
+        row_span = math.ceil(reach_miles / self.radius)
+        col_spans = self._col_spans(rows, row_span, reach_miles)
+        d_rows, d_cols, col_distance = self._offsets(row_span, int(col_spans.max()) if len(col_spans) else 0)
+        # One row per (query, neighbouring cell), keeping only the cells inside each query's own span
+        query_ids, offsets = np.nonzero(col_distance[None, :] <= col_spans[:, None])
+        keys = _cell_key(rows[query_ids] + d_rows[offsets], cols[query_ids] + d_cols[offsets])
+        slots = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        hit = self.keys[slots] == keys
+        query_ids, slots = query_ids[hit], slots[hit]
+        counts = self.counts[slots]
+        # Expand each (query, cell) into one row per point in the cell
+        pair_queries = np.repeat(query_ids, counts)
+        firsts = np.repeat(self.starts[slots] - (np.cumsum(counts) - counts), counts)
+        return pair_queries, self.order[firsts + np.arange(len(pair_queries))]
+
+    def _pairs_one(self, lat, lon, reach_miles):
+        row, col = math.floor(lat / self.cell), math.floor(lon / self.cell)
+        row_span = math.ceil(reach_miles / self.radius)
+        edge_lat = max(abs((row - row_span) * self.cell), abs((row + row_span + 1) * self.cell))
+        cos_lat = max(math.cos(math.radians(min(edge_lat, 89.0))), 1e-6)
+        col_span = math.ceil(reach_miles / (MILES_PER_DEG_LON_EQUATOR * cos_lat) / self.cell)
+        found = [self.order[start:end]
+                 for r in range(row - row_span, row + row_span + 1)
+                 for c in range(col - col_span, col + col_span + 1)
+                 for start, end in (self.slots.get(_cell_key(r, c), (0, 0)),)
+                 if end > start]
+        ids = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        return np.zeros(len(ids), dtype=np.int64), ids
+
+    def cells_per_query(self, lats, reach_miles):
+        """Most cells any query at these latitudes looks at for `reach_miles`."""
+        if not len(lats):
+            return 0
+        row_span = math.ceil(reach_miles / self.radius)
+        edge_lat = min(89.0, float(np.max(np.abs(lats))) + (row_span + 1) * self.cell)
+        col_span = math.ceil(reach_miles / (MILES_PER_DEG_LON_EQUATOR * max(math.cos(math.radians(edge_lat)), 1e-6)) / self.cell)
+        return (2 * row_span + 1) * (2 * col_span + 1)
+
+
+class MasjidMatcher:
+    """
+    Matches listing coordinates against the masjid catalog in bulk.
+    One distance computation yields both the within-radius matches and the
+    distance to the nearest masjid (used to explain skipped listings).
+
+    Large catalogs are bucketed into a GridIndex, so radius queries only
+    compute distances to masjids in nearby cells, and the nearest masjid of a
+    listing with none in range is found in a widening ring of cells.
+    """
+
+    def __init__(self, masjids, radius_miles):
+        self.radius = radius_miles
+        self.masjids = [m for m in masjids if m.get('lat') and m.get('lon')]
+        self.names = [m['name'] for m in self.masjids]
+        self.lats = np.array([m['lat'] for m in self.masjids], dtype=np.float64)
+        self.lons = np.array([m['lon'] for m in self.masjids], dtype=np.float64)
+        self.grid = None
+        if len(self.masjids) >= GRID_MIN_CATALOG:
+            self.grid = GridIndex(self.lats, self.lons, radius_miles)
+
+    def match(self, lats, lons, with_nearest=True):
+        """
+        Returns (nearby, nearest) for a batch of coordinates: nearby[i] is the
+        list of {'name', 'distance'} within the radius sorted by distance, and
+        nearest[i] is the distance to the closest masjid (inf if there are none,
+        or if with_nearest is False and nothing is in range).
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        nearby = [[] for _ in range(len(lats))]
+        nearest = np.full(len(lats), np.inf)
+        if not self.names or not len(lats):
+            return nearby, nearest
+
+        if self.grid is None:
+            self._match_full(lats, lons, np.arange(len(lats)), nearby, nearest)
+        else:
+            self._match_grid(lats, lons, nearby, nearest)
+            if with_nearest:
+                # Only listings with nothing in range still need their nearest masjid
+                missing = np.nonzero(~np.isfinite(nearest))[0]
+                if len(missing):
+                    self._nearest_grid(lats, lons, missing, nearest)
+
+        for matches in nearby:
+            matches.sort(key=lambda x: x['distance'])
+        return nearby, nearest
+
+    def match_one(self, lat, lon):
+        nearby, nearest = self.match([lat], [lon])
+        return nearby[0], float(nearest[0])
+
+    def _collect(self, dists, rows, masjid_ids, nearby):
+        hit_rows, hit_cols = np.nonzero(dists <= self.radius)
+        for r, c in zip(hit_rows.tolist(), hit_cols.tolist()):
+            nearby[rows[r]].append({'name': self.names[masjid_ids[c]], 'distance': float(dists[r, c])})
+
+    def _block_rows(self):
+        return max(1, MATCH_BLOCK_CELLS // len(self.names))
+
+    def _match_full(self, lats, lons, rows, nearby, nearest):
+        all_ids = np.arange(len(self.names))
+        step = self._block_rows()
+        for start in range(0, len(rows), step):
+            block = rows[start:start + step]
+            dists = distance_matrix(lats[block], lons[block], self.lats, self.lons)
+            nearest[block] = dists.min(axis=1)
+            self._collect(dists, block, all_ids, nearby)
+
+    def _nearest_full(self, lats, lons, rows, nearest):
+        step = self._block_rows()
+        for start in range(0, len(rows), step):
+            block = rows[start:start + step]
+            nearest[block] = distance_matrix(lats[block], lons[block], self.lats, self.lons).min(axis=1)
+
+    def _grid_distances(self, lats, lons, rows, reach):
+        """(listing row, masjid id, distance) for the grid candidates within `reach` miles of each of `rows`."""
+        queries, masjid_ids = self.grid.pairs(lats[rows], lons[rows], reach)
+        queries = rows[queries]
+        dists = pair_distances(lats[queries], lons[queries], self.lats[masjid_ids], self.lons[masjid_ids])
+        return queries, masjid_ids, dists
+
+    def _match_grid(self, lats, lons, nearby, nearest):
+        # Candidates for a block of listings are gathered and measured in one pass
+        step = max(1, MATCH_BLOCK_CELLS // max(1, self.grid.cells_per_query(lats, self.radius)))
+        for start in range(0, len(lats), step):
+            queries, masjid_ids, dists = self._grid_distances(lats, lons, np.arange(start, min(start + step, len(lats))), self.radius)
+            hits = np.nonzero(dists <= self.radius)[0]
+            # A candidate-only minimum is exact only when it is inside the radius
+            np.minimum.at(nearest, queries[hits], dists[hits])
+            for q, m, d in zip(queries[hits].tolist(), masjid_ids[hits].tolist(), dists[hits].tolist()):
+                nearby[q].append({'name': self.names[m], 'distance': d})
+
+    def _nearest_grid(self, lats, lons, rows, nearest):
+        # Widen the ring of cells around each listing until it holds a masjid no farther than the ring reaches
+        reach = self.radius * 2
+        while len(rows):
+            if self.grid.cells_per_query(lats[rows], reach) > NEAREST_MAX_CELLS:
+                self._nearest_full(lats, lons, rows, nearest)
+                return
+            queries, _, dists = self._grid_distances(lats, lons, rows, reach)
+            found = np.full(len(lats), np.inf)
+            np.minimum.at(found, queries, dists)
+            done = found[rows] <= reach
+            nearest[rows[done]] = found[rows[done]]
+            rows = rows[~done]
+            reach *= 2
@@ -0,0 +1,120 @@
+from urllib.parse import urlsplit
+
+from sources import SOURCES
+
+# Resource types we never need: cards only need DOM text and image URLs, not the image bytes
+DEFAULT_BLOCK_TYPES = {'image', 'media', 'font'}
+# Ad, analytics and tracking hosts (suffix match)
+DEFAULT_DENY_DOMAINS = [
+    'doubleclick.net', 'googlesyndication.com', 'googletagmanager.com', 'google-analytics.com',
+    'googleadservices.com', 'adservice.google.com', 'amazon-adsystem.com', 'adsrvr.org',
+    'facebook.net', 'facebook.com', 'bat.bing.com', 'clarity.ms',
+    'hotjar.com', 'segment.io', 'segment.com', 'newrelic.com', 'nr-data.net', 'optimizely.com',
+    'scorecardresearch.com', 'quantserve.com', 'criteo.com', 'criteo.net', 'taboola.com',
+    'outbrain.com', 'pinterest.com', 'tiktok.com', 'snapchat.com',
+    'branch.io', 'fullstory.com', 'mouseflow.com', 'crazyegg.com', 'pubmatic.com', 'rubiconproject.com',
+]
+# Never blocked, whatever the type: bot checks must load or the results never show
+DEFAULT_ALLOW_DOMAINS = ['px-cdn.net', 'px-cloud.net', 'perimeterx.net', 'hcaptcha.com', 'recaptcha.net']
+
+# Per-source overrides of the defaults above
+SOURCE_POLICIES = {
+    'Realtor.com': {
+        # Realtor.com's captcha page renders its challenge as images
+        'block_types': {'media', 'font'},
+    },
+}
+
+# Typical transfer sizes, used to estimate what blocked requests would have cost
+ESTIMATED_BYTES = {'image': 60_000, 'media': 500_000, 'font': 40_000, 'script': 40_000,
+                   'stylesheet': 20_000, 'xhr': 5_000, 'fetch': 5_000, 'other': 5_000}
+
+
+def _host(url):
+    return urlsplit(url).hostname or ""
+
+
+def _matches(host, domains):
+    return any(host == d or host.endswith('.' + d) for d in domains)
+
+
+class NetworkPolicy:
+    """
+    Request-interception policy for scraping contexts.
+
+    Each request is judged by the source whose site the page is on (see
+    SOURCE_POLICIES): allow-listed hosts always pass, then deny-listed hosts
+    and blocked resource types are aborted. Blocked requests are counted per
+    type with an estimate of the bytes saved.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.source_hosts = {_host(cfg['base_url']).removeprefix('www.'): name for name, cfg in SOURCES.items()}
+        self.blocked = {}
+        self.allowed = 0
+        self.allowed_bytes = 0
+
+    def policy_for(self, page_url):
+        host = _host(page_url)
+        for source_host, source in self.source_hosts.items():
+            if _matches(host, [source_host]):
+                return SOURCE_POLICIES.get(source, {})
+        return {}
+
+    def should_block(self, request):
+        if not self.enabled:
+            return False
+        host = _host(request.url)
+        try:
+            policy = self.policy_for(request.frame.url)
+        except Exception:
+            policy = {}
+        if _matches(host, policy.get('allow_domains', DEFAULT_ALLOW_DOMAINS)):
+            return False
+        if _matches(host, policy.get('deny_domains', DEFAULT_DENY_DOMAINS)):
+            return True
+        return request.resource_type in policy.get('block_types', DEFAULT_BLOCK_TYPES)
+
+    def _count(self, request, blocked):
+        if blocked:
+            kind = request.resource_type
+            self.blocked[kind] = self.blocked.get(kind, 0) + 1
+        else:
+            self.allowed += 1
+
+    def _on_response(self, response):
+        length = response.headers.get('content-length')
+        if length and length.isdigit():
+            self.allowed_bytes += int(length)
+
+    def install(self, context):
+        """Routes every request of a sync BrowserContext through the policy."""
+        def handle(route):
+            blocked = self.should_block(route.request)
+            self._count(route.request, blocked)
+            if blocked:
+                route.abort()
+            else:
+                route.continue_()
+        context.route("**/*", handle)
+        context.on("response", self._on_response)
+
+    async def install_async(self, context):
+        async def handle(route):
+            blocked = self.should_block(route.request)
+            self._count(route.request, blocked)
+            if blocked:
+                await route.abort()
+            else:
+                await route.continue_()
+        await context.route("**/*", handle)
+        context.on("response", self._on_response)
+
+    def report(self):
+        blocked_total = sum(self.blocked.values())
+        saved = sum(ESTIMATED_BYTES.get(kind, ESTIMATED_BYTES['other']) * n for kind, n in self.blocked.items())
+        by_type = ", ".join(f"{kind} {n}" for kind, n in sorted(self.blocked.items(), key=lambda kv: -kv[1]))
+        return (f"Network policy: blocked {blocked_total} of {blocked_total + self.allowed} requests "
+                f"(~{saved / 1_000_000:.1f} MB saved; {by_type or 'none'}), "
+                f"{self.allowed_bytes / 1_000_000:.1f} MB downloaded")
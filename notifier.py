@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+
+from listing_keys import canonical_link
+from price_history import parse_price, PRICE_UNKNOWN
+
+SENT_LEDGER_FILE = 'sent_ledger.json'
+# Ledger entries for listings not notified about in this long are dropped
+SENT_LEDGER_RETENTION_DAYS = 90
+# Longest message each provider accepts in one request. TextMeBot and CallMeBot
+# take the text in a GET query string, so their limit is set by URL length.
+MESSAGE_CHAR_LIMITS = {
+    'textmebot': 1500,
+    'callmebot': 1500,
+    'telegram': 4096,
+    'whatsapp': 4096,
+}
+DEFAULT_CHAR_LIMIT = 1500
+
+DIGEST_FOOTER = "\nOpen http://localhost:8080 for full details.\nSent automatically by Musaddique's Bot"
+
+KIND_LABELS = {'new': "🆕", 'price_drop': "📉", 'changed': "✏️"}
+
+
+class SentLedger:
+    """
+    What each recipient has already been told, as
+    {recipient: {'watermark': ts, 'sent': {canonical link: [price, sent_at]}}}.
+    The watermark is how far into the listing store's change feed the
+    recipient has been brought up to date.
+    """
+
+    def __init__(self, path=SENT_LEDGER_FILE, retention_days=SENT_LEDGER_RETENTION_DAYS):
+        self.path = path
+        self.retention = retention_days * 86400
+        self.lock = threading.Lock()
+        self.recipients = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Warning: ignoring unreadable sent ledger {self.path}: {e}")
+            return {}
+
+    def _recipient(self, recipient):
+        return self.recipients.setdefault(recipient, {'watermark': 0, 'sent': {}})
+
+    def watermark(self, recipient):
+        with self.lock:
+            return self._recipient(recipient)['watermark']
+
+    def advance(self, recipient, watermark):
+        with self.lock:
+            entry = self._recipient(recipient)
+            entry['watermark'] = max(entry['watermark'], watermark)
+
+    def classify(self, recipient, listing):
+        """'new', 'price_drop', 'changed' (other price change), or None if already sent as-is."""
+        with self.lock:
+            sent = self._recipient(recipient)['sent'].get(canonical_link(listing['link']))
+        if sent is None:
+            return 'new'
+        old_price = sent[0]
+        if old_price == listing['price']:
+            return None
+        old_value, new_value = parse_price(old_price), parse_price(listing['price'])
+        if PRICE_UNKNOWN not in (old_value, new_value) and new_value < old_value:
+            return 'price_drop'
+        return 'changed'
+
+    def previous_price(self, recipient, link):
+        with self.lock:
+            sent = self._recipient(recipient)['sent'].get(link)
+        return sent[0] if sent else None
+
+    def mark_sent(self, recipient, listings):
+        now = time.time()
+        with self.lock:
+            sent = self._recipient(recipient)['sent']
+            for listing in listings:
+                sent[canonical_link(listing['link'])] = [listing['price'], now]
+
+    def prune(self):
+        cutoff = time.time() - self.retention
+        with self.lock:
+            for entry in self.recipients.values():
+                entry['sent'] = {link: v for link, v in entry['sent'].items() if v[1] >= cutoff}
+
+    def save(self):
+        with self.lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.recipients, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+
+
+def _listing_line(kind, distance, listing, old_price):
+    price = f"{old_price} → {listing['price']}" if old_price and kind != 'new' else listing['price']
+    return f"{KIND_LABELS[kind]} {distance:.2f}mi | {price}\n{listing['link']}\n"
+
+
+def chunk_digest(header, groups, limit, footer=DIGEST_FOOTER):
+    """
+    Packs a digest into messages of at most `limit` characters, breaking only
+    between listing lines. A masjid split across messages repeats its heading.
+    `groups` is [(masjid heading, [(line, listing), ...])]. Returns
+    [(text, [listing, ...])] so each message's listings can be marked sent
+    once that message is delivered.
+    """
+    messages = []
+    parts, listings, size = [header], [], len(header)
+    budget = limit - len(footer) - len("(99/99) ")
+
+    def flush():
+        nonlocal parts, listings, size
+        if listings:
+            messages.append(("".join(parts), listings))
+        parts, listings, size = [], [], 0
+
+    for heading, lines in groups:
+        heading_written = False
+        for line, listing in lines:
+            if listings and size + len(line) + (0 if heading_written else len(heading)) > budget:
+                flush()
+                heading_written = False
+            if not heading_written:
+                parts.append(heading)
+                size += len(heading)
+                heading_written = True
+            parts.append(line)
+            listings.append(listing)
+            size += len(line)
+    flush()
+
+    total = len(messages)
+    result = []
+    for i, (text, chunk_listings) in enumerate(messages, 1):
+        if total > 1:
+            text = f"({i}/{total}) " + text
+        if i == total:
+            text += footer
+        result.append((text, chunk_listings))
+    return result
+
+
+class Notifier:
+    """
+    Sends each recipient only what changed since it was last notified.
+
+    Candidates come from the listing store's change feed (ListingDB.changes_since
+    the recipient's watermark), so a run with no changes costs one indexed
+    query. Each candidate is then checked against the recipient's ledger:
+    listings never sent are 'new', a lower price is a 'price_drop', any other
+    price change is 'changed', and anything already sent at the same price is
+    skipped. Digests are split at the provider's message size limit, and each
+    message's listings are recorded as sent only after that message is
+    delivered.
+    """
+
+    def __init__(self, listing_db, ledger=None):
+        self.listing_db = listing_db
+        self.ledger = ledger or SentLedger()
+
+    def pending(self, recipient, run_id=None):
+        """([(kind, listing, previous price)], new watermark) for `recipient`."""
+        candidates, watermark = self.listing_db.changes_since(self.ledger.watermark(recipient), run_id)
+        items = []
+        for listing in candidates:
+            kind = self.ledger.classify(recipient, listing)
+            if kind:
+                items.append((kind, listing, self.ledger.previous_price(recipient, canonical_link(listing['link']))))
+        return items, watermark
+
+    def digest(self, items, limit):
+        by_masjid = {}
+        for kind, listing, old_price in items:
+            for match in listing.get('nearby_masjids', []):
+                by_masjid.setdefault(match['name'], []).append((match['distance'], kind, listing, old_price))
+        groups = []
+        for name in sorted(by_masjid):
+            entries = sorted(by_masjid[name], key=lambda e: e[0])
+            groups.append((f"\n🕋 *{name}* ({len(entries)})\n",
+                           [(_listing_line(kind, dist, listing, old), listing) for dist, kind, listing, old in entries]))
+        counts = {kind: sum(1 for k, _, _ in items if k == kind) for kind in KIND_LABELS}
+        header = (f"🏠 {counts['new']} new, {counts['price_drop']} price drops, "
+                  f"{counts['changed']} updated homes\n")
+        return chunk_digest(header, groups, limit)
+
+    def notify(self, recipient, provider, send, run_id=None):
+        """
+        Sends pending changes to `recipient` through `send(text) -> bool`.
+        Returns the number of messages delivered.
+        """
+        items, watermark = self.pending(recipient, run_id)
+        if not items:
+            print(f"No new or changed listings for {recipient}.")
+            self.ledger.advance(recipient, watermark)
+            self.ledger.save()
+            return 0
+        messages = self.digest(items, MESSAGE_CHAR_LIMITS.get(provider, DEFAULT_CHAR_LIMIT))
+        print(f"Sending {len(items)} changed listings to {recipient} in {len(messages)} messages...")
+        delivered = 0
+        for text, listings in messages:
+            if not send(text):
+                break
+            self.ledger.mark_sent(recipient, listings)
+            delivered += 1
+        if delivered == len(messages):
+            self.ledger.advance(recipient, watermark)
+        self.ledger.prune()
+        self.ledger.save()
+        return delivered
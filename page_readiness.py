@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import time
+
+from sources import SOURCES
+
+READINESS_FILE = 'readiness_stats.json'
+# Timeout budget per source is learned from how long its results took to appear in past runs
+DEFAULT_BUDGET_SECONDS = 10.0
+MIN_BUDGET_SECONDS = 3.0
+MAX_BUDGET_SECONDS = 30.0
+HISTORY_SIZE = 50
+MIN_SAMPLES = 3
+# Give a human this long to solve a captcha; we stop waiting as soon as results appear
+CAPTCHA_SOLVE_TIMEOUT = 120.0
+# Card-count-stable check: poll until the count stops changing, for at most STABLE_MAX_SECONDS
+STABLE_POLL_SECONDS = 0.25
+STABLE_MAX_SECONDS = 3.0
+
+COUNT_SCRIPT = "(selector) => document.querySelectorAll(selector).length"
+
+
+class PageReadiness:
+    """
+    Waits for a results page to be usable instead of sleeping a fixed time.
+
+    A page is ready once its card selector matches and the number of cards
+    has stopped growing. Timeouts come from a per-source budget derived from
+    past ready times, and time spent waiting is tallied per source and per
+    (city, source) job for the run report.
+    """
+
+    def __init__(self, path=READINESS_FILE):
+        self.path = path
+        self.history = self.load()
+        self.wait_seconds = {}
+        self.waits = {}
+        self.timeouts = {}
+        self.job_waits = {}
+        self.job_seconds = {}
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.history, f)
+        os.replace(tmp_path, self.path)
+
+    def budget(self, source):
+        samples = sorted(self.history.get(source, []))
+        if len(samples) < MIN_SAMPLES:
+            return DEFAULT_BUDGET_SECONDS
+        p90 = samples[int(0.9 * (len(samples) - 1))]
+        return min(MAX_BUDGET_SECONDS, max(MIN_BUDGET_SECONDS, p90 * 2))
+
+    def _record(self, source, city, elapsed, ready, learn):
+        self.wait_seconds[source] = self.wait_seconds.get(source, 0.0) + elapsed
+        if city:
+            self.job_waits[(city, source)] = self.job_waits.get((city, source), 0.0) + elapsed
+        self.waits[source] = self.waits.get(source, 0) + 1
+        if not ready:
+            self.timeouts[source] = self.timeouts.get(source, 0) + 1
+        elif learn:
+            samples = self.history.setdefault(source, [])
+            samples.append(round(elapsed, 2))
+            del samples[:-HISTORY_SIZE]
+
+    def record_job(self, city, source, seconds):
+        """Wall-clock time of one concurrent (city, source) job, reported against its own waits."""
+        self.job_seconds[(city, source)] = self.job_seconds.get((city, source), 0.0) + seconds
+
+    def wait(self, page, source, city=None, timeout=None):
+        """Blocks until the page's results are ready. Returns False if the budget ran out first."""
+        selector = SOURCES[source]['card_selector']
+        budget = timeout or self.budget(source)
+        start = time.monotonic()
+        deadline = start + budget
+        ready = True
+        try:
+            page.wait_for_selector(selector, timeout=budget * 1000)
+            last = page.evaluate(COUNT_SCRIPT, selector)
+            stable_until = min(deadline, time.monotonic() + STABLE_MAX_SECONDS)
+            while time.monotonic() < stable_until:
+                page.wait_for_timeout(STABLE_POLL_SECONDS * 1000)
+                count = page.evaluate(COUNT_SCRIPT, selector)
+                if count == last:
+                    break
+                last = count
+        except Exception:
+            ready = False
+        self._record(source, city, time.monotonic() - start, ready, learn=timeout is None)
+        return ready
+
+    async def wait_async(self, page, source, city=None, timeout=None):
+        selector = SOURCES[source]['card_selector']
+        budget = timeout or self.budget(source)
+        start = time.monotonic()
+        deadline = start + budget
+        ready = True
+        try:
+            await page.wait_for_selector(selector, timeout=budget * 1000)
+            last = await page.evaluate(COUNT_SCRIPT, selector)
+            stable_until = min(deadline, time.monotonic() + STABLE_MAX_SECONDS)
+            while time.monotonic() < stable_until:
+                await asyncio.sleep(STABLE_POLL_SECONDS)
+                count = await page.evaluate(COUNT_SCRIPT, selector)
+                if count == last:
+                    break
+                last = count
+        except Exception:
+            ready = False
+        self._record(source, city, time.monotonic() - start, ready, learn=timeout is None)
+        return ready
+
+    def report(self, crawl_seconds):
+        total_wait = sum(self.wait_seconds.values())
+        if self.job_seconds:
+            # Concurrent jobs wait at the same time, so only a job's own time is comparable to its waits
+            lines = [f"Page readiness: {len(self.job_seconds)} concurrent jobs over {crawl_seconds:.1f}s of crawling"]
+            for (city, source), seconds in sorted(self.job_seconds.items()):
+                waited = self.job_waits.get((city, source), 0.0)
+                lines.append(f"  {city} / {source}: waited {waited:.1f}s of {seconds:.1f}s "
+                             f"({max(seconds - waited, 0):.1f}s working)")
+        else:
+            lines = [f"Page readiness: waited {total_wait:.1f}s over {crawl_seconds:.1f}s of crawling "
+                     f"({max(crawl_seconds - total_wait, 0):.1f}s working)"]
+        for source, seconds in sorted(self.wait_seconds.items()):
+            lines.append(f"  {source}: {self.waits[source]} waits, {seconds:.1f}s, "
+                         f"{self.timeouts.get(source, 0)} timeouts, next budget {self.budget(source):.1f}s")
+        return "\n".join(lines)
@@ -0,0 +1,181 @@
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+
+PRICE_HISTORY_DIR = 'price_history'
+# Chunks are merged into one sorted chunk once there are more than this many
+MAX_CHUNKS = 16
+STATUSES = ['active', 'gone']
+PRICE_UNKNOWN = -1
+
+_PRICE_RE = re.compile(r"\$?\s*([\d,.]+)\s*([kKmM]?)")
+
+
+def parse_price(price):
+    """'$725,000' -> 725000, '$700K' -> 700000; PRICE_UNKNOWN when there is no number."""
+    match = _PRICE_RE.search(price or "")
+    if not match:
+        return PRICE_UNKNOWN
+    try:
+        value = float(match.group(1).replace(',', ''))
+    except ValueError:
+        return PRICE_UNKNOWN
+    value *= {'k': 1_000, 'm': 1_000_000}.get(match.group(2).lower(), 1)
+    return int(value) if 0 < value < 2**31 else PRICE_UNKNOWN
+
+
+class PriceHistory:
+    """
+    Columnar observation log: one row of (listing id, timestamp, price, status)
+    per listing per run, stored as numpy column chunks. Links map to integer
+    ids in meta.json. Each save() adds one compressed chunk; when chunks pile
+    up they are merged into a single chunk sorted by (id, timestamp), so
+    queries are a few vectorized passes over the columns.
+    """
+
+    def __init__(self, path=PRICE_HISTORY_DIR):
+        self.path = path
+        self.lock = threading.Lock()
+        meta = self.load_meta()
+        self.links = meta.get('links', [])
+        self.ids = {link: i for i, link in enumerate(self.links)}
+        self.gone = set(meta.get('gone', []))
+        self.pending = []
+        self._columns = None
+
+    def load_meta(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json'), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _id(self, link):
+        # Caller holds self.lock
+        listing_id = self.ids.get(link)
+        if listing_id is None:
+            listing_id = self.ids[link] = len(self.links)
+            self.links.append(link)
+        return listing_id
+
+    def record(self, link, price, status='active', ts=None):
+        with self.lock:
+            listing_id = self._id(link)
+            if status == 'active':
+                self.gone.discard(listing_id)
+            else:
+                self.gone.add(listing_id)
+            self.pending.append((listing_id, int(ts or time.time()), parse_price(price), STATUSES.index(status)))
+            self._columns = None
+
+    def mark_gone(self, link, ts=None):
+        """Records that a listing stopped showing up; repeated calls for the same listing are ignored."""
+        listing_id = self.ids.get(link)
+        if listing_id is not None and listing_id not in self.gone:
+            self.record(link, None, 'gone', ts)
+
+    def _chunk_files(self):
+        return sorted(glob.glob(os.path.join(self.path, 'chunk-*.npz')))
+
+    def _write_chunk(self, number, ids, ts, prices, statuses):
+        path = os.path.join(self.path, f"chunk-{number:06d}.npz")
+        with open(path + '.tmp', 'wb') as f:
+            np.savez_compressed(f, id=ids, ts=ts, price=prices, status=statuses)
+        os.replace(path + '.tmp', path)
+
+    def save(self):
+        with self.lock:
+            os.makedirs(self.path, exist_ok=True)
+            # Meta first: a chunk must never reference an id meta.json doesn't have
+            meta_path = os.path.join(self.path, 'meta.json')
+            with open(meta_path + '.tmp', 'w') as f:
+                json.dump({'links': self.links, 'gone': sorted(self.gone)}, f, separators=(',', ':'))
+            os.replace(meta_path + '.tmp', meta_path)
+            if not self.pending:
+                return
+            chunks = self._chunk_files()
+            number = int(os.path.basename(chunks[-1])[6:12]) + 1 if chunks else 1
+            self._write_chunk(number, *self._pending_columns())
+            self.pending = []
+            if len(chunks) + 1 > MAX_CHUNKS:
+                self._compact(number + 1)
+
+    def _pending_columns(self):
+        rows = np.array(self.pending, dtype=np.int64).reshape(-1, 4)
+        rows = rows[np.lexsort((rows[:, 1], rows[:, 0]))] # Every chunk is sorted by (id, ts)
+        return (rows[:, 0].astype(np.uint32), rows[:, 1], rows[:, 2].astype(np.int32), rows[:, 3].astype(np.uint8))
+
+    def _compact(self, number):
+        # Caller holds self.lock
+        chunks = self._chunk_files()
+        ids, ts, prices, statuses = self._load_sorted(chunks)
+        self._write_chunk(number, ids, ts, prices, statuses)
+        for path in chunks:
+            os.remove(path)
+
+    def _load_sorted(self, chunks, extra=None):
+        parts = [np.load(path) for path in chunks]
+        columns = [[p[name] for p in parts] for name in ('id', 'ts', 'price', 'status')]
+        if extra:
+            for column, values in zip(columns, extra):
+                column.append(values)
+        if not columns[0]:
+            return np.zeros(0, np.uint32), np.zeros(0, np.int64), np.zeros(0, np.int32), np.zeros(0, np.uint8)
+        ids, ts, prices, statuses = (np.concatenate(c) for c in columns)
+        if len(chunks) == 1 and not extra:
+            return ids, ts, prices, statuses
+        order = np.lexsort((ts, ids))
+        return ids[order], ts[order], prices[order], statuses[order]
+
+    def columns(self):
+        """(ids, timestamps, prices, statuses) for every observation, sorted by id then time."""
+        with self.lock:
+            if self._columns is None:
+                extra = self._pending_columns() if self.pending else None
+                self._columns = self._load_sorted(self._chunk_files(), extra)
+            return self._columns
+
+    def price_changes(self, days=7, now=None):
+        """Price changes observed in the last `days` days, newest first, as dicts with old/new prices."""
+        ids, ts, prices, _ = self.columns()
+        cutoff = (now or time.time()) - days * 86400
+        changed = ((ids[1:] == ids[:-1]) & (prices[1:] != prices[:-1])
+                   & (prices[1:] != PRICE_UNKNOWN) & (prices[:-1] != PRICE_UNKNOWN) & (ts[1:] >= cutoff))
+        rows = np.nonzero(changed)[0] + 1
+        rows = rows[np.argsort(-ts[rows], kind='stable')]
+        return [{'link': self.links[ids[i]], 'ts': int(ts[i]), 'old': int(prices[i - 1]), 'new': int(prices[i])}
+                for i in rows]
+
+    def days_on_market(self, now=None):
+        """{link: days} from first sighting until it went away, or until now if still listed."""
+        ids, ts, _, statuses = self.columns()
+        if not len(ids):
+            return {}
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        ends = np.r_[starts[1:], len(ids)] - 1
+        gone = statuses[ends] == STATUSES.index('gone')
+        until = np.where(gone, ts[ends], int(now or time.time()))
+        days = (until - ts[starts]) / 86400
+        return {self.links[i]: float(d) for i, d in zip(ids[starts], days)}
+
+    def stats(self):
+        ids, _, _, _ = self.columns()
+        return f"Price history: {len(ids)} observations of {len(self.links)} listings, {len(self.price_changes(days=1))} price changes in the last day"
+
+
+if __name__ == "__main__":
+    # Usage: python price_history.py [days]  (price changes in the last `days` days, default 7)
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 7
+    history = PriceHistory()
+    on_market = history.days_on_market()
+    for change in history.price_changes(days):
+        arrow = "▼" if change['new'] < change['old'] else "▲"
+        when = time.strftime('%Y-%m-%d', time.localtime(change['ts']))
+        print(f"{when} {arrow} ${change['old']:,} -> ${change['new']:,} "
+              f"({on_market.get(change['link'], 0):.0f} days listed) {change['link']}")
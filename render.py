@@ -0,0 +1,632 @@
+import hashlib
+import json
+import os
+import re
+import string
+from html import escape
+from urllib.parse import quote
+
+from price_history import parse_price
+
+# Inline grey box, so a missing photo never depends on a third-party placeholder service
+PLACEHOLDER_IMAGE = ("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 300 200'%3E"
+                     "%3Crect width='300' height='200' fill='%23e5e7eb'/%3E%3Ctext x='150' y='105' "
+                     "font-family='sans-serif' font-size='16' fill='%239ca3af' text-anchor='middle'%3ENo Image%3C/text%3E%3C/svg%3E")
+
+# urllib.parse.quote was the slowest step per card. Query values only need the characters
+# that would end or alter them encoded; the href itself is HTML-escaped afterwards.
+_QUERY_ESCAPES = [('%', '%25'), ('&', '%26'), ('#', '%23'), ('+', '%2B'), (' ', '%20'), ('\n', '%0A')]
+_QUERY_SAFE = "/:?=,$()@!*;'"
+
+
+def url_quote(text):
+    """Percent-encodes `text` for use as a query parameter value."""
+    if not text.isascii():
+        return quote(text, safe=_QUERY_SAFE)
+    for char, code in _QUERY_ESCAPES:
+        if char in text:
+            text = text.replace(char, code)
+    return text
+
+
+class Template:
+    """
+    A str.format-style template parsed once at import. `{name}` and
+    `{name:.2f}` are HTML-escaped on output; `{name!s}` marks a value that
+    is already safe markup and is written as-is. Literal braces are doubled.
+    """
+
+    def __init__(self, text):
+        # Recompiled into a plain "{name}" format string; specs and escaping are applied per field first
+        self.fields = []
+        compiled = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            compiled.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field is not None:
+                self.fields.append((field, spec, conversion == 's'))
+                compiled.append("{" + field + "}")
+        self.compiled = "".join(compiled)
+
+    def render(self, values):
+        out = {}
+        for field, spec, raw in self.fields:
+            value = format(values[field], spec) if spec else str(values[field])
+            out[field] = value if raw else escape(value)
+        return self.compiled.format_map(out)
+
+    def write(self, f, values):
+        f.write(self.render(values))
+
+
+BASE_STYLE = """
+    body { font-family: 'Segoe UI', sans-serif; background-color: #f3f4f6; color: #1f2937; margin: 0; padding: 20px; }
+    h1 { text-align: center; color: #db2777; margin-bottom: 20px; }
+    .status-bar { text-align: center; color: #6b7280; margin-bottom: 40px; font-size: 0.9em; }
+    .masjid-section { margin: 40px auto; max-width: 1200px; }
+    .masjid-title { font-size: 1.5em; color: #4b5563; border-left: 5px solid #db2777; padding-left: 15px; margin-bottom: 20px; font-weight: bold; background: white; padding: 10px 15px; border-radius: 0 8px 8px 0; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }
+    .container { display: grid; grid-template-columns: repeat(auto-fill, minmax(300px, 1fr)); gap: 25px; }
+    .card { background: white; border-radius: 12px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.1); transition: transform 0.2s; display: flex; flex-direction: column; }
+    .card:hover { transform: translateY(-4px); box-shadow: 0 10px 15px rgba(0,0,0,0.1); }
+    .card img { width: 100%; height: 200px; object-fit: cover; }
+    .card-content { padding: 20px; flex-grow: 1; display: flex; flex-direction: column; }
+    .source-badge { font-size: 0.75em; text-transform: uppercase; font-weight: bold; color: #9ca3af; margin-bottom: 5px; }
+    .price { font-size: 1.5em; color: #be185d; font-weight: 800; margin-bottom: 5px; }
+    .address { color: #4b5563; font-size: 1.1em; line-height: 1.4; margin-bottom: 15px; }
+    .dist-badge { align-self: flex-start; background: #e0f2fe; color: #0369a1; padding: 4px 10px; border-radius: 20px; font-size: 0.85em; font-weight: 600; margin-bottom: 15px; }
+    .actions { margin-top: auto; display: grid; grid-template-columns: 1fr 1fr; gap: 10px; }
+    .btn { padding: 10px; text-align: center; text-decoration: none; border-radius: 6px; font-weight: 600; font-size: 0.9em; transition: background 0.2s; }
+    .btn-view { background: #f3f4f6; color: #374151; }
+    .btn-view:hover { background: #e5e7eb; }
+    .btn-wa { background: #22c55e; color: white; }
+    .btn-wa:hover { background: #16a34a; }
+    .empty { text-align: center; padding: 50px; color: #666; }
+    .masjid-link { display: block; text-decoration: none; }
+    .masjid-link .masjid-title { margin-bottom: 0; }
+    .masjid-link:hover .masjid-title { color: #db2777; }
+    .back-link { display: block; max-width: 1200px; margin: 10px auto; color: #be185d; font-weight: 600; text-decoration: none; }
+    .toolbar { display: flex; flex-wrap: wrap; gap: 10px; align-items: center; max-width: 1200px; margin: 0 auto 25px; }
+    .toolbar input, .toolbar select { padding: 10px; border: 1px solid #ddd; border-radius: 6px; font-size: 15px; background: white; }
+    .toolbar input { flex: 1; min-width: 200px; }
+    .toolbar span { color: #6b7280; font-size: 0.9em; }
+    .vgrid { position: relative; max-width: 1200px; margin: 0 auto; }
+    .vgrid .card { position: absolute; height: 470px; box-sizing: border-box; }
+    .vgrid .address { max-height: 4.2em; overflow: hidden; }
+"""
+
+SECURE_STYLE = """
+    body { padding: 0; }
+    #login-screen {
+        position: fixed; top: 0; left: 0; width: 100%; height: 100%;
+        background: linear-gradient(135deg, #be185d 0%, #881337 100%);
+        display: flex; justify-content: center; align-items: center; z-index: 1000;
+    }
+    .login-box { background: white; padding: 40px; border-radius: 12px; box-shadow: 0 20px 25px -5px rgba(0,0,0,0.1); width: 300px; text-align: center; }
+    .login-box h2 { margin-top: 0; color: #881337; }
+    .login-box input { width: 90%; padding: 12px; margin: 10px 0; border: 1px solid #ddd; border-radius: 6px; font-size: 16px; box-sizing: border-box; }
+    .login-box button { width: 100%; padding: 12px; margin-top: 10px; background: #be185d; color: white; border: none; border-radius: 6px; font-size: 16px; cursor: pointer; transition: background 0.2s; font-weight: bold; }
+    .login-box button:hover { background: #9d174d; }
+    .error { color: #ef4444; font-size: 0.9em; margin-top: 15px; display: none; background: #fee2e2; padding: 10px; border-radius: 6px; }
+    #app-content { display: none; padding: 20px; }
+    .header-bar { display: flex; justify-content: space-between; align-items: center; max-width: 1200px; margin: 0 auto; color: #666; font-size: 0.9em; }
+    .logout-btn { color: #be185d; cursor: pointer; text-decoration: underline; font-weight: bold; }
+"""
+
+PAGE_HEAD = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+{head_extra!s}
+    <style>{style!s}</style>
+</head>
+<body>
+{body_intro!s}
+{back_link!s}
+    <h1>{heading}</h1>
+    <div class="status-bar">{status}</div>
+""")
+
+SECTION_HEAD = Template("""
+    <div class="masjid-section">
+        <div class="masjid-title">{masjid} · {count} found</div>
+        <div class="container">
+""")
+
+SECTION_FOOT = "        </div>\n    </div>\n"
+
+# Index entry pointing at a masjid's own page
+SECTION_LINK = Template("""
+    <a class="masjid-section masjid-link" href="{href}">
+        <div class="masjid-title">{masjid} · {count} found · from {nearest:.1f} mi →</div>
+    </a>
+""")
+
+BACK_LINK = Template("""    <a class="back-link" href="{href}">← All masjids</a>
+""")
+
+CARD = Template("""
+            <div class="card">
+                <img src="{image}" alt="Home" loading="lazy">
+                <div class="card-content">
+                    <div class="source-badge">{source}</div>
+                    <div class="price">{price}</div>
+                    <div class="address">{address}</div>
+                    <div class="dist-badge">📍 {distance:.2f} miles away</div>
+                    <div class="actions">
+                        <a href="{link}" target="_blank" class="btn btn-view">View details</a>
+                        <a href="{wa_link}" target="_blank" class="btn btn-wa">WhatsApp</a>
+                    </div>
+                </div>
+            </div>
+""")
+
+EMPTY = Template("""    <div class="empty">{message}</div>
+""")
+
+# Firebase login gate used by the published page (update_html.py)
+SECURE_HEAD = """    <script src="https://www.gstatic.com/firebasejs/9.22.0/firebase-app-compat.js"></script>
+    <script src="https://www.gstatic.com/firebasejs/9.22.0/firebase-auth-compat.js"></script>"""
+
+SECURE_INTRO = """
+<div id="login-screen">
+    <div class="login-box">
+        <h2>🔒 Secure Access</h2>
+        <p style="color: #666; font-size: 0.9em; margin-bottom: 20px;">Please sign in to view listings.</p>
+        <input type="email" id="emailInput" placeholder="Email" onkeyup="if(event.key==='Enter') document.getElementById('passInput').focus()">
+        <input type="password" id="passInput" placeholder="Password" onkeyup="if(event.key==='Enter') login()">
+        <button onclick="login()" id="loginBtn">Sign In</button>
+        <div id="loginError" class="error"></div>
+    </div>
+</div>
+
+<div id="app-content">
+    <div class="header-bar">
+        <span>Signed in as <strong id="userDisplay">...</strong></span>
+        <span class="logout-btn" onclick="logout()">Sign Out</span>
+    </div>
+"""
+
+SECURE_SCRIPT = Template("""
+</div> <!-- End App Content -->
+
+<script>
+    // Split in two so the key isn't one greppable literal in the published page
+    const p1 = {key_head!s};
+    const p2 = {key_tail!s};
+    const firebaseConfig = {{
+        apiKey: p1 + p2,
+        authDomain: {auth_domain!s},
+        projectId: {project_id!s},
+        storageBucket: {storage_bucket!s},
+        messagingSenderId: {sender_id!s},
+        appId: {app_id!s},
+        measurementId: {measurement_id!s}
+    }};
+
+    firebase.initializeApp(firebaseConfig);
+    const auth = firebase.auth();
+
+    // Log out when the tab closes
+    auth.setPersistence(firebase.auth.Auth.Persistence.SESSION)
+        .catch((error) => console.error("Auth Persistence Error:", error));
+
+    const emailInput = document.getElementById('emailInput');
+    const passInput = document.getElementById('passInput');
+    const loginBtn = document.getElementById('loginBtn');
+    const errorMsg = document.getElementById('loginError');
+
+    function login() {{
+        const email = emailInput.value;
+        const pass = passInput.value;
+        if (!email || !pass) {{
+            showError("Please enter email and password.");
+            return;
+        }}
+        loginBtn.innerText = "Verifying...";
+        errorMsg.style.display = 'none';
+        auth.signInWithEmailAndPassword(email, pass)
+            .catch((error) => {{
+                showError(error.message);
+                loginBtn.innerText = "Sign In";
+            }});
+    }}
+
+    function logout() {{
+        auth.signOut();
+    }}
+
+    function showError(msg) {{
+        errorMsg.innerText = msg;
+        errorMsg.style.display = 'block';
+    }}
+
+    auth.onAuthStateChanged((user) => {{
+        if (user) {{
+            document.getElementById('login-screen').style.display = 'none';
+            document.getElementById('app-content').style.display = 'block';
+            document.getElementById('userDisplay').innerText = user.email;
+        }} else {{
+            document.getElementById('login-screen').style.display = 'flex';
+            document.getElementById('app-content').style.display = 'none';
+            loginBtn.innerText = "Sign In";
+            emailInput.value = "";
+            passInput.value = "";
+        }}
+    }});
+</script>
+""")
+
+PAGE_FOOT = "</body>\n</html>\n"
+
+HEADING = "Compatible Homes Near Masjids"
+
+# Masjid pages are a fixed shell: the cards come from the data file and are drawn by site.js
+MASJID_BODY = Template("""
+    <div class="toolbar">
+        <input id="search" type="search" placeholder="Filter by address, price or source">
+        <select id="sort">
+            <option value="distance">Closest first</option>
+            <option value="price-asc">Lowest price</option>
+            <option value="price-desc">Highest price</option>
+        </select>
+        <span id="count"></span>
+    </div>
+    <div id="grid" class="vgrid" data-src="{data_src}" data-placeholder="{placeholder}"><div class="empty">Loading listings…</div></div>
+    <script src="{script_src}" defer></script>
+""")
+
+# Columns of each row in data/<masjid>.json
+DATA_FIELDS = ['distance', 'address', 'price', 'price_value', 'link', 'image', 'source']
+
+# Client renderer for masjid pages. Only the cards in (or near) the viewport
+# exist in the DOM, so a page with thousands of listings costs the same to
+# paint as one with ten; images load as their cards scroll into view.
+SITE_JS = r"""(function () {
+    const CARD_MIN_WIDTH = 300, GAP = 25, CARD_HEIGHT = 470, OVERSCAN_ROWS = 2;
+    const grid = document.getElementById('grid');
+    const PLACEHOLDER = grid.dataset.placeholder;
+    const search = document.getElementById('search');
+    const sort = document.getElementById('sort');
+    const count = document.getElementById('count');
+    let masjid = "", all = [], view = [], cols = 1, cardWidth = CARD_MIN_WIDTH, drawn = "";
+
+    function el(tag, cls, text) {
+        const node = document.createElement(tag);
+        if (cls) node.className = cls;
+        if (text !== undefined) node.textContent = text;
+        return node;
+    }
+
+    function card(r) {
+        const c = el('div', 'card');
+        const img = el('img');
+        img.loading = 'lazy';
+        img.alt = 'Home';
+        // Cached thumbnails are site-relative ("thumbs/…"); the page lives one folder down
+        img.src = !r.image ? PLACEHOLDER : /^https?:/.test(r.image) ? r.image : '../' + r.image;
+        const body = el('div', 'card-content');
+        body.append(el('div', 'source-badge', r.source), el('div', 'price', r.price),
+                    el('div', 'address', r.address), el('div', 'dist-badge', '📍 ' + r.distance.toFixed(2) + ' miles away'));
+        const actions = el('div', 'actions');
+        const view = el('a', 'btn btn-view', 'View details');
+        view.href = r.link;
+        view.target = '_blank';
+        const wa = el('a', 'btn btn-wa', 'WhatsApp');
+        wa.href = 'https://wa.me/?text=' + encodeURIComponent('Check this house near ' + masjid + ' (' +
+            r.distance.toFixed(2) + ' mi): ' + r.address + ' - ' + r.price + ' - ' + r.link);
+        wa.target = '_blank';
+        actions.append(view, wa);
+        body.append(actions);
+        c.append(img, body);
+        return c;
+    }
+
+    // Listings without a usable price go last in either direction
+    function byPrice(a, b, direction) {
+        if (a.price_sort === null || b.price_sort === null) {
+            return (a.price_sort === null) - (b.price_sort === null);
+        }
+        return direction * (a.price_sort - b.price_sort);
+    }
+
+    function apply() {
+        const q = search.value.trim().toLowerCase();
+        view = q ? all.filter(r => r.haystack.indexOf(q) >= 0) : all.slice();
+        if (sort.value === 'price-asc') view.sort((a, b) => byPrice(a, b, 1));
+        else if (sort.value === 'price-desc') view.sort((a, b) => byPrice(a, b, -1));
+        count.textContent = view.length + ' of ' + all.length + ' listings';
+        layout();
+    }
+
+    function layout() {
+        const width = grid.clientWidth;
+        cols = Math.max(1, Math.floor((width + GAP) / (CARD_MIN_WIDTH + GAP)));
+        cardWidth = (width - GAP * (cols - 1)) / cols;
+        grid.style.height = Math.ceil(view.length / cols) * (CARD_HEIGHT + GAP) + 'px';
+        drawn = "";
+        draw();
+    }
+
+    function draw() {
+        const top = grid.getBoundingClientRect().top;
+        const rowHeight = CARD_HEIGHT + GAP;
+        const rows = Math.ceil(view.length / cols);
+        const first = Math.max(0, Math.floor(-top / rowHeight) - OVERSCAN_ROWS);
+        const last = Math.min(rows, Math.ceil((window.innerHeight - top) / rowHeight) + OVERSCAN_ROWS);
+        const key = first + ':' + last + ':' + cols;
+        if (key === drawn) return;
+        drawn = key;
+        const frag = document.createDocumentFragment();
+        for (let i = first * cols; i < Math.min(view.length, last * cols); i++) {
+            const c = card(view[i]);
+            c.style.top = Math.floor(i / cols) * rowHeight + 'px';
+            c.style.left = (i % cols) * (cardWidth + GAP) + 'px';
+            c.style.width = cardWidth + 'px';
+            frag.append(c);
+        }
+        grid.replaceChildren(frag);
+        if (!view.length) grid.append(el('div', 'empty', all.length ? 'No listings match the filter.' : 'No listings.'));
+    }
+
+    let pending = false;
+    function schedule() {
+        if (pending) return;
+        pending = true;
+        requestAnimationFrame(() => { pending = false; draw(); });
+    }
+
+    fetch(grid.dataset.src).then(r => r.json()).then(data => {
+        masjid = data.masjid;
+        const f = {};
+        data.fields.forEach((name, i) => f[name] = i);
+        all = data.rows.map(row => ({
+            distance: row[f.distance], address: row[f.address], price: row[f.price], link: row[f.link],
+            image: row[f.image], source: row[f.source],
+            price_sort: row[f.price_value] < 0 ? null : row[f.price_value],
+            haystack: (row[f.address] + ' ' + row[f.price] + ' ' + row[f.source]).toLowerCase()
+        }));
+        search.addEventListener('input', apply);
+        sort.addEventListener('change', apply);
+        window.addEventListener('scroll', schedule, { passive: true });
+        // Also fires when a login gate reveals the page
+        new ResizeObserver(layout).observe(grid);
+        apply();
+    }).catch(err => {
+        grid.replaceChildren(el('div', 'empty', 'Could not load listings (' + err + ').'));
+    });
+})();
+"""
+
+
+def _js_string(value):
+    # json.dumps gives a valid JS string literal; '</' is split so it can't close the <script>
+    return json.dumps(value or "").replace("</", "<\\/")
+
+
+def firebase_values():
+    key = os.getenv('FIREBASE_API_KEY', '')
+    return {
+        'key_head': _js_string(key[:10]),
+        'key_tail': _js_string(key[10:]),
+        'auth_domain': _js_string(os.getenv('FIREBASE_AUTH_DOMAIN')),
+        'project_id': _js_string(os.getenv('FIREBASE_PROJECT_ID')),
+        'storage_bucket': _js_string(os.getenv('FIREBASE_STORAGE_BUCKET')),
+        'sender_id': _js_string(os.getenv('FIREBASE_MESSAGING_SENDER_ID')),
+        'app_id': _js_string(os.getenv('FIREBASE_APP_ID')),
+        'measurement_id': _js_string(os.getenv('FIREBASE_MEASUREMENT_ID')),
+    }
+
+
+def group_by_masjid(listings, masjids):
+    """
+    {masjid name: [(distance, listing), ...]} sorted by distance. Listings are
+    referenced, not copied; masjids.json order comes first, then any masjid
+    only named in the listings.
+    """
+    groups = {m['name']: [] for m in masjids}
+    for listing in listings:
+        for match in listing.get('nearby_masjids', []):
+            groups.setdefault(match['name'], []).append((match['distance'], listing))
+    for entries in groups.values():
+        entries.sort(key=lambda entry: entry[0])
+    return groups
+
+
+def listing_image(listing, thumbs):
+    """Local thumbnail if one is cached, else the source's URL, else ""."""
+    image = listing.get('image') or ""
+    if thumbs and image in thumbs:
+        return thumbs[image]
+    return image if "http" in image else ""
+
+
+def card_values(masjid, distance, listing, thumbs=None):
+    image = listing_image(listing, thumbs) or PLACEHOLDER_IMAGE
+    wa_text = (f"Check this house near {masjid} ({distance:.2f} mi): "
+               f"{listing['address']} - {listing['price']} - {listing['link']}")
+    return {
+        'image': image,
+        'source': listing['source'],
+        'price': listing['price'],
+        'address': listing['address'],
+        'distance': distance,
+        'link': listing['link'],
+        'wa_link': "https://wa.me/?text=" + url_quote(wa_text),
+    }
+
+
+def write_section(f, masjid, entries, thumbs=None):
+    SECTION_HEAD.write(f, {'masjid': masjid, 'count': len(entries)})
+    for distance, listing in entries:
+        CARD.write(f, card_values(masjid, distance, listing, thumbs))
+    f.write(SECTION_FOOT)
+
+
+def write_head(f, title, heading, status, secure=False, back_href=None):
+    PAGE_HEAD.write(f, {
+        'title': title,
+        'head_extra': SECURE_HEAD if secure else "",
+        'style': BASE_STYLE + (SECURE_STYLE if secure else ""),
+        'body_intro': SECURE_INTRO if secure else "",
+        'back_link': BACK_LINK.render({'href': back_href}) if back_href else "",
+        'heading': heading,
+        'status': status,
+    })
+
+
+def write_foot(f, secure=False):
+    if secure:
+        SECURE_SCRIPT.write(f, firebase_values())
+    f.write(PAGE_FOOT)
+
+
+def write_page(f, listings, masjids, title, empty_message, secure=False, thumbs=None):
+    """Streams the whole page, every masjid's cards included, to the open text file `f`."""
+    write_head(f, title, HEADING, f"Tracking {len(listings)} listings across {len(masjids)} Masjids", secure)
+    shown = 0
+    for masjid, entries in group_by_masjid(listings, masjids).items():
+        if entries:
+            write_section(f, masjid, entries, thumbs)
+            shown += 1
+    if not shown:
+        EMPTY.write(f, {'message': empty_message})
+    write_foot(f, secure)
+
+
+def _atomic_write(path, write):
+    """Runs write(f) into a temp file, then renames it over `path` so a half-written page is never served."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def render_file(path, listings, masjids, title, empty_message, secure=False, thumbs=None):
+    _atomic_write(path, lambda f: write_page(f, listings, masjids, title, empty_message, secure, thumbs))
+
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "masjid"
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+# Part of every page hash, so editing a template re-renders everything once
+RENDER_VERSION = _digest([t.compiled for t in (PAGE_HEAD, SECTION_HEAD, SECTION_LINK, BACK_LINK, CARD, EMPTY,
+                                                SECURE_SCRIPT, MASJID_BODY)]
+                         + [BASE_STYLE, SECURE_STYLE, SECURE_HEAD, SECURE_INTRO, SECTION_FOOT, PAGE_FOOT,
+                            DATA_FIELDS, SITE_JS])
+
+
+def masjid_data(masjid, entries, thumbs=None):
+    """Compact, row-oriented payload of one masjid's listings for site.js."""
+    rows = []
+    for distance, listing in entries:
+        price_value = parse_price(listing['price'])
+        rows.append([round(distance, 2), listing['address'], listing['price'], price_value,
+                     listing['link'], listing_image(listing, thumbs), listing['source']])
+    return {'masjid': masjid, 'fields': DATA_FIELDS, 'rows': rows}
+
+
+class SiteRenderer:
+    """
+    Renders index.html as an overview plus, per masjid, a fixed page shell
+    (masjids/<slug>.html) and its listings as JSON (data/<slug>.json), drawn
+    in the browser by site.js. Every file is keyed by a hash of exactly the
+    data it holds. Files whose hash matches the manifest from the last render
+    are neither rendered nor written, so their mtimes (and the ETags static
+    hosts derive from them) stay put and a deploy only uploads what changed.
+    Files for masjids that no longer have listings are removed.
+    """
+
+    def __init__(self, out_dir='.', manifest_name='render_manifest.json'):
+        self.out_dir = out_dir
+        self.manifest_path = os.path.join(out_dir, manifest_name)
+        self.manifest = self.load_manifest()
+        self.rendered = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _page(self, rel_path, inputs, write):
+        digest = _digest([RENDER_VERSION, inputs])
+        path = os.path.join(self.out_dir, rel_path)
+        if self.manifest.get(rel_path) == digest and os.path.exists(path):
+            self.unchanged += 1
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        _atomic_write(path, write)
+        self.manifest[rel_path] = digest
+        self.rendered += 1
+
+    def render(self, listings, masjids, title, empty_message, secure=False, thumbs=None):
+        # Firebase settings are baked into secure pages, so they are part of every page's inputs
+        shared = [title, secure, firebase_values() if secure else None]
+        self._page("site.js", [], lambda f: f.write(SITE_JS))
+        pages = {}
+        for masjid, entries in group_by_masjid(listings, masjids).items():
+            if not entries:
+                continue
+            slug = slugify(masjid)
+            while f"masjids/{slug}.html" in pages:
+                slug += "-x" # Two names that slugify alike
+            rel_path = f"masjids/{slug}.html"
+            pages[rel_path] = (masjid, entries)
+            data = masjid_data(masjid, entries, thumbs)
+            self._page(f"data/{slug}.json", data,
+                       lambda f, d=data: json.dump(d, f, separators=(',', ':'), ensure_ascii=False))
+            self._page(rel_path, shared + [masjid, slug],
+                       lambda f, m=masjid, s=slug: self.write_masjid_page(f, m, s, title, secure))
+
+        summary = [(rel_path, masjid, len(entries), entries[0][0]) for rel_path, (masjid, entries) in pages.items()]
+        index_inputs = shared + [empty_message, len(listings), len(masjids), summary]
+        self._page("index.html", index_inputs,
+                   lambda f: self.write_index(f, summary, len(listings), len(masjids), title, empty_message, secure))
+
+        live = set(pages) | {f"data/{p[len('masjids/'):-len('.html')]}.json" for p in pages}
+        for rel_path in [p for p in self.manifest if p.startswith(("masjids/", "data/")) and p not in live]:
+            path = os.path.join(self.out_dir, rel_path)
+            if os.path.exists(path):
+                os.remove(path)
+            del self.manifest[rel_path]
+            self.removed += 1
+        self.save_manifest()
+
+    def write_index(self, f, summary, listing_count, masjid_count, title, empty_message, secure):
+        write_head(f, title, HEADING, f"Tracking {listing_count} listings across {masjid_count} Masjids", secure)
+        for rel_path, masjid, count, nearest in summary:
+            SECTION_LINK.write(f, {'href': rel_path, 'masjid': masjid, 'count': count, 'nearest': nearest})
+        if not summary:
+            EMPTY.write(f, {'message': empty_message})
+        write_foot(f, secure)
+
+    def write_masjid_page(self, f, masjid, slug, title, secure):
+        write_head(f, f"{masjid} · {title}", f"Homes Near {masjid}", "", secure, back_href="../index.html")
+        MASJID_BODY.write(f, {'data_src': f"../data/{slug}.json", 'script_src': "../site.js",
+                              'placeholder': PLACEHOLDER_IMAGE})
+        write_foot(f, secure)
+
+    def stats(self):
+        return f"Site: {self.rendered} files rendered, {self.unchanged} unchanged, {self.removed} removed"
+
+
+def render_site(listings, masjids, title, empty_message, secure=False, out_dir='.', thumbs=None):
+    """`thumbs` maps image URLs to cached thumbnails (image_cache.load_thumbnail_map)."""
+    site = SiteRenderer(out_dir)
+    site.render(listings, masjids, title, empty_message, secure, thumbs)
+    return site
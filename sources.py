@@ -0,0 +1,255 @@
+import os
+from urllib.parse import urljoin
+
+from structured_data import STRUCTURED_BLOBS_SCRIPT, ResponseCapture, listings_from_blobs
+
+# 'auto': use embedded JSON / captured API payloads when the page has them, else DOM cards.
+# 'structured' never falls back to the DOM; 'dom' ignores structured data.
+EXTRACTION_MODE = os.getenv('EXTRACTION_MODE', 'auto')
+
+# Budget per (city, source) search: stop after this many result pages or yielded cards
+MAX_RESULT_PAGES = 5
+MAX_LISTINGS_PER_SEARCH = 250
+
+# Each extraction script runs inside the results page and returns every card
+# as {address, price, link, image} in a single round trip to the browser.
+
+REALTOR_EXTRACT_SCRIPT = """
+() => Array.from(document.querySelectorAll('div[data-testid="property-card"]')).map(card => {
+    const text = el => el ? el.innerText.trim() : '';
+    const addressEl = card.querySelector('[data-testid="card-address"]');
+    const parts = addressEl ? Array.from(addressEl.querySelectorAll('[data-testid]')).map(text) : [];
+    const linkEl = card.querySelector('a[href^="/realestateandhomes-detail"]');
+    const img = card.querySelector('img');
+    return {
+        address: parts.length ? parts.join(', ') : text(addressEl).replace(/\\n/g, ', '),
+        price: text(card.querySelector('[data-testid="card-price"]')),
+        link: linkEl ? linkEl.getAttribute('href') : '',
+        image: img ? (img.getAttribute('src') || '') : ''
+    };
+}).filter(r => r.address && r.price)
+"""
+
+FSBO_EXTRACT_SCRIPT = """
+() => {
+    let cards = Array.from(document.querySelectorAll('div[class*="card-"]'));
+    if (!cards.length) cards = Array.from(document.querySelectorAll('div.shadow.rounded-lg.relative.flex'));
+    const records = [];
+    for (const card of cards) {
+        // Link is on the address <a>; its first text node is the street address,
+        // the city/state sits in a child span we must exclude
+        const linkEl = card.querySelector('a[href^="/listing/"]');
+        if (!linkEl) continue;
+        const first = linkEl.childNodes[0];
+        const priceEl = Array.from(card.querySelectorAll('span.text-xl')).find(el => el.textContent.includes('$'));
+        const img = card.querySelector('img');
+        records.push({
+            address: first ? first.textContent.trim() : '',
+            price: priceEl ? priceEl.innerText.trim() : 'N/A',
+            link: linkEl.getAttribute('href'),
+            image: img ? (img.getAttribute('src') || '') : ''
+        });
+    }
+    return records;
+}
+"""
+
+HOMES_EXTRACT_SCRIPT = """
+() => {
+    let cards = Array.from(document.querySelectorAll('article[data-testid="listing-card"]'));
+    if (!cards.length) cards = Array.from(document.querySelectorAll('.placards-list ul li article'));
+    const records = [];
+    for (const card of cards) {
+        const priceEl = card.querySelector('.price-container');
+        const nameEl = card.querySelector('.property-name');
+        const linkEl = card.querySelector('a');
+        if (!priceEl || !nameEl || !linkEl || !linkEl.getAttribute('href')) continue;
+        const img = card.querySelector('img');
+        records.push({
+            address: nameEl.innerText.trim(),
+            price: priceEl.innerText.trim(),
+            link: linkEl.getAttribute('href'),
+            image: img ? (img.getAttribute('src') || '') : ''
+        });
+    }
+    return records;
+}
+"""
+
+SOURCES = {
+    'Realtor.com': {
+        'search_url': "https://www.realtor.com/realestateandhomes-search/{city}_AZ/beds-2/baths-2/type-single-story-home",
+        'base_url': "https://www.realtor.com",
+        'extract_script': REALTOR_EXTRACT_SCRIPT,
+        'card_selector': 'div[data-testid="property-card"]',
+        # Search API the results page calls; its JSON carries coordinates
+        'xhr_patterns': ['/api/v1/rdc_search_srp'],
+        'page_url': "https://www.realtor.com/realestateandhomes-search/{city}_AZ/beds-2/baths-2/type-single-story-home/pg-{page}",
+    },
+    'ForSaleByOwner': {
+        # URL format: .../Phoenix-AZ/2-beds/2-baths/single-story
+        'search_url': "https://www.forsalebyowner.com/search/list/{city}-AZ/2-beds/2-baths/single-story",
+        'base_url': "https://www.forsalebyowner.com",
+        'extract_script': FSBO_EXTRACT_SCRIPT,
+        'card_selector': 'a[href^="/listing/"]',
+        # "View More Listings" links to .../2-page, .../3-page, ...
+        'next_selector': 'a[href^="/search/list/"][href$="/{page}-page"]',
+    },
+    'Homes.com': {
+        # property_type=1 is typically House/Single Family
+        'search_url': "https://www.homes.com/{city_lower}-az/homes-for-sale/2-bedroom/?property_type=1&bathrooms=2g",
+        'base_url': "https://www.homes.com",
+        'extract_script': HOMES_EXTRACT_SCRIPT,
+        'card_selector': 'article[data-testid="listing-card"], .placards-list ul li article',
+        'page_url': "https://www.homes.com/{city_lower}-az/homes-for-sale/2-bedroom/p{page}/?property_type=1&bathrooms=2g",
+    },
+}
+
+
+NEXT_LINK_SCRIPT = """
+(selector) => {
+    const el = document.querySelector(selector);
+    return el ? el.getAttribute('href') : null;
+}
+"""
+
+
+def search_url(source, city):
+    return SOURCES[source]['search_url'].format(city=city, city_lower=city.lower())
+
+
+def _next_from_template(source, city, page_no):
+    template = SOURCES[source].get('page_url')
+    return template.format(city=city, city_lower=city.lower(), page=page_no) if template else None
+
+
+def finish_records(source, records, page_url):
+    """Makes links absolute; a card without its own link falls back to the results page."""
+    base_url = SOURCES[source]['base_url']
+    for record in records:
+        record['link'] = urljoin(base_url, record['link']) if record.get('link') else page_url
+        record['image'] = record.get('image') or ""
+    return records
+
+
+def next_page_url(page, source, city, page_no):
+    """URL of result page `page_no`: the site's own next link if it has one, else the URL template."""
+    selector = SOURCES[source].get('next_selector')
+    if selector:
+        href = page.evaluate(NEXT_LINK_SCRIPT, selector.format(page=page_no))
+        if href:
+            return urljoin(SOURCES[source]['base_url'], href)
+    return _next_from_template(source, city, page_no)
+
+
+async def next_page_url_async(page, source, city, page_no):
+    selector = SOURCES[source].get('next_selector')
+    if selector:
+        href = await page.evaluate(NEXT_LINK_SCRIPT, selector.format(page=page_no))
+        if href:
+            return urljoin(SOURCES[source]['base_url'], href)
+    return _next_from_template(source, city, page_no)
+
+
+def _unseen(cards, seen):
+    # The same listing can appear in both JSON-LD and an API payload, or on two pages
+    fresh = []
+    for card in cards:
+        if card['link'] not in seen:
+            seen.add(card['link'])
+            fresh.append(card)
+    return fresh
+
+
+def iter_cards(page, source, city, settle, max_pages=MAX_RESULT_PAGES, max_listings=MAX_LISTINGS_PER_SEARCH, capture=None):
+    """
+    Yields cards from the results page already loaded in `page`, then follows
+    pagination until a page adds nothing new or the page/listing budget runs
+    out. `settle(page)` is called after each navigation to let results render.
+    Pass the ResponseCapture from capture_responses() to include API payloads.
+    """
+    seen = set()
+    yielded = 0
+    for page_no in range(1, max_pages + 1):
+        if page_no > 1:
+            url = next_page_url(page, source, city, page_no)
+            if not url:
+                return
+            page.goto(url, timeout=60000, wait_until='domcontentloaded')
+            settle(page)
+
+        new_cards = _unseen(extract_cards(page, source, capture), seen)
+        print(f"  {source} {city} page {page_no}: {len(new_cards)} new cards")
+        if not new_cards:
+            return
+        for card in new_cards:
+            yield card
+            yielded += 1
+            if yielded >= max_listings:
+                return
+
+
+async def iter_cards_async(page, source, city, settle, max_pages=MAX_RESULT_PAGES, max_listings=MAX_LISTINGS_PER_SEARCH, capture=None):
+    """Async twin of iter_cards; `settle` is a coroutine function."""
+    seen = set()
+    yielded = 0
+    for page_no in range(1, max_pages + 1):
+        if page_no > 1:
+            url = await next_page_url_async(page, source, city, page_no)
+            if not url:
+                return
+            await page.goto(url, timeout=60000, wait_until='domcontentloaded')
+            await settle(page)
+
+        new_cards = _unseen(await extract_cards_async(page, source, capture), seen)
+        print(f"  {source} {city} page {page_no}: {len(new_cards)} new cards")
+        if not new_cards:
+            return
+        for card in new_cards:
+            yield card
+            yielded += 1
+            if yielded >= max_listings:
+                return
+
+
+class capture_responses:
+    """Context manager that records the source's search API responses on `page` while open."""
+
+    def __init__(self, page, source):
+        self.page = page
+        self.capture = ResponseCapture(SOURCES[source].get('xhr_patterns'))
+
+    def __enter__(self):
+        self.capture.attach(self.page)
+        return self.capture
+
+    def __exit__(self, *exc):
+        self.capture.detach(self.page)
+        return False
+
+
+def extract_cards(page, source, capture=None):
+    """
+    Returns every card on the current results page. Structured payloads
+    (JSON-LD, __NEXT_DATA__, captured API JSON) are preferred because they
+    also carry coordinates; otherwise one page.evaluate reads the DOM cards.
+    """
+    if EXTRACTION_MODE != 'dom':
+        records = listings_from_blobs(page.evaluate(STRUCTURED_BLOBS_SCRIPT))
+        if capture:
+            records += capture.drain()
+        if records or EXTRACTION_MODE == 'structured':
+            return finish_records(source, records, page.url)
+    records = page.evaluate(SOURCES[source]['extract_script'])
+    return finish_records(source, records, page.url)
+
+
+async def extract_cards_async(page, source, capture=None):
+    if EXTRACTION_MODE != 'dom':
+        records = listings_from_blobs(await page.evaluate(STRUCTURED_BLOBS_SCRIPT))
+        if capture:
+            records += await capture.drain_async()
+        if records or EXTRACTION_MODE == 'structured':
+            return finish_records(source, records, page.url)
+    records = await page.evaluate(SOURCES[source]['extract_script'])
+    return finish_records(source, records, page.url)
@@ -0,0 +1,165 @@
+import json
+
+# Reads every embedded data blob on the page in one round trip
+STRUCTURED_BLOBS_SCRIPT = """
+() => Array.from(document.querySelectorAll('script[type="application/ld+json"], script#__NEXT_DATA__'))
+    .map(s => s.textContent)
+"""
+
+# Listing arrays are rarely nested deeper than this in __NEXT_DATA__ / API payloads
+MAX_DEPTH = 12
+# schema.org types that describe a home for sale; agents, brokerages and other
+# organizations carry a PostalAddress and url too but are not listings
+JSON_LD_LISTING_TYPES = {'RealEstateListing', 'SingleFamilyResidence', 'House', 'Residence', 'Apartment'}
+
+
+def format_price(value):
+    if isinstance(value, (int, float)):
+        return f"${value:,.0f}"
+    return str(value) if value else "N/A"
+
+
+def _first_image(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get('url') or value.get('contentUrl') or value.get('href')
+    return value or ""
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_ld_types(obj):
+    types = obj.get('@type')
+    if isinstance(types, str):
+        types = [types]
+    return {t.rsplit('/', 1)[-1] for t in types if isinstance(t, str)} if isinstance(types, list) else set()
+
+
+def _from_json_ld(obj):
+    """schema.org RealEstateListing / SingleFamilyResidence (or a Product with offers) with a PostalAddress."""
+    types = _json_ld_types(obj)
+    if not (types & JSON_LD_LISTING_TYPES or ('Product' in types and obj.get('offers'))):
+        return None
+    address = obj.get('address')
+    if not isinstance(address, dict) or not address.get('streetAddress'):
+        return None
+    offers = obj.get('offers')
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    offers = offers or {}
+    link = offers.get('url') or obj.get('url')
+    if not link:
+        return None
+    geo = obj.get('geo') or {}
+    return {
+        'address': address['streetAddress'].strip(),
+        'price': format_price(offers.get('price')),
+        'link': link,
+        'image': _first_image(obj.get('image')),
+        'lat': _to_float(geo.get('latitude')),
+        'lon': _to_float(geo.get('longitude')),
+    }
+
+
+def _from_realtor(obj):
+    """Realtor.com search results (__NEXT_DATA__ and its search API share this shape)."""
+    location = obj.get('location')
+    if not obj.get('permalink') or not isinstance(location, dict):
+        return None
+    address = location.get('address') or {}
+    if not address.get('line'):
+        return None
+    coordinate = address.get('coordinate') or {}
+    city_state = " ".join(p for p in (address.get('state_code'), address.get('postal_code')) if p)
+    return {
+        'address': ", ".join(p for p in (address.get('line'), address.get('city'), city_state) if p),
+        'price': format_price(obj.get('list_price')),
+        'link': "/realestateandhomes-detail/" + obj['permalink'],
+        'image': _first_image(obj.get('primary_photo')),
+        'lat': _to_float(coordinate.get('lat')),
+        'lon': _to_float(coordinate.get('lon')),
+    }
+
+
+def listings_from_json(data):
+    """Walks a decoded payload and returns every listing record it recognises."""
+    records = []
+
+    def walk(node, depth):
+        if depth > MAX_DEPTH:
+            return
+        if isinstance(node, dict):
+            record = _from_json_ld(node) or _from_realtor(node)
+            if record:
+                records.append(record)
+                return
+            for value in node.values():
+                if isinstance(value, (dict, list)):
+                    walk(value, depth + 1)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, depth + 1)
+
+    walk(data, 0)
+    return records
+
+
+def listings_from_blobs(blobs):
+    """Parses raw JSON-LD / __NEXT_DATA__ script contents; malformed blobs are skipped."""
+    records = []
+    for blob in blobs:
+        try:
+            records.extend(listings_from_json(json.loads(blob)))
+        except (TypeError, ValueError):
+            continue
+    return records
+
+
+class ResponseCapture:
+    """
+    Keeps JSON responses whose URL matches one of `patterns` (the source's
+    search API) so their listings can be read after the page settles. Bodies
+    are read later, outside the event handler.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+        self.responses = []
+
+    def attach(self, page):
+        if self.patterns:
+            page.on("response", self._on_response)
+
+    def detach(self, page):
+        if self.patterns:
+            page.remove_listener("response", self._on_response)
+
+    def _on_response(self, response):
+        if any(p in response.url for p in self.patterns):
+            self.responses.append(response)
+
+    def drain(self):
+        pending, self.responses = self.responses, []
+        records = []
+        for response in pending:
+            try:
+                records.extend(listings_from_json(response.json()))
+            except Exception:
+                continue
+        return records
+
+    async def drain_async(self):
+        pending, self.responses = self.responses, []
+        records = []
+        for response in pending:
+            try:
+                records.extend(listings_from_json(await response.json()))
+            except Exception:
+                continue
+        return records
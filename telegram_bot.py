@@ -4,6 +4,7 @@ def send_telegram_message(token, chat_id, message):
     """
     Sends a message via Telegram Bot API.
     100% Free, Official API, Reliable.
+    Returns True if Telegram accepted the message.
     """
     url = f"https://api.telegram.org/bot{token}/sendMessage"
     payload = {
@@ -18,10 +19,11 @@ def send_telegram_message(token, chat_id, message):
         
         if response.status_code == 200 and data.get("ok"):
             print("✅ Telegram Message SENT.")
-        else:
-            print(f"❌ Telegram Error: {data.get('description')}")
+            return True
+        print(f"❌ Telegram Error: {data.get('description')}")
     except Exception as e:
         print(f"❌ Network Error: {e}")
+    return False
 
 if __name__ == "__main__":
     print("Test sending...")
@@ -10,6 +10,9 @@ def send_textmebot_message(apikey, recipient, message):
         apikey (str): Your TextMeBot API Key
         recipient (str): Phone number (international format) OR Group ID (e.g. 120363040377@g.us)
         message (str): The text message to send
+
+    Returns:
+        bool: True if the API accepted the message
     """
     encoded_message = urllib.parse.quote(message)
     url = f"https://api.textmebot.com/send.php?recipient={recipient}&apikey={apikey}&text={encoded_message}"
@@ -20,10 +23,11 @@ def send_textmebot_message(apikey, recipient, message):
         if response.status_code == 200:
              print("✅ API Request Sent.")
              print(f"Response: {response.text}")
-        else:
-            print(f"❌ API Request Failed: {response.status_code} - {response.text}")
+             return True
+        print(f"❌ API Request Failed: {response.status_code} - {response.text}")
     except Exception as e:
         print(f"❌ Network Error: {e}")
+    return False
 
 if __name__ == "__main__":
     # Test
@@ -4,130 +4,165 @@ from playwright.sync_api import sync_playwright
 
 # Directory to store WhatsApp session data so you don't have to scan QR code every time
 SESSION_DIR = os.path.join(os.getcwd(), "wa_session")
+LOGIN_TIMEOUT_SECONDS = 600
+# How long to wait for a searched chat to open before giving up
+CHAT_OPEN_TIMEOUT_MS = 15000
 
-def send_whatsapp_message(group_name, message):
+SEARCH_BOX = 'div[contenteditable="true"][data-tab="3"]'
+MESSAGE_BOX = 'div[contenteditable="true"][data-tab="10"]'
+LOGGED_IN = f'{SEARCH_BOX}, div[aria-label="Chat list"], div[data-testid="chat-list"]'
+
+# WhatsApp keeps a pasted message's newlines as line breaks, in one edit
+PASTE_TEXT = """text => {
+    const data = new DataTransfer();
+    data.setData('text/plain', text);
+    document.activeElement.dispatchEvent(
+        new ClipboardEvent('paste', {clipboardData: data, bubbles: true, cancelable: true}));
+}"""
+
+
+def _title_selector(scope, name):
+    escaped = name.replace('\\', '\\\\').replace('"', '\\"')
+    return f'{scope} span[title="{escaped}"]'
+
+
+class WhatsAppSession:
     """
-    Sends a message to a specific WhatsApp group using Playwright.
-    This method is robust and does not interfere with the user's mouse/keyboard
-    because it interacts directly with the browser DOM.
+    One logged-in WhatsApp Web tab. start() launches the persistent browser
+    context and waits for the chat list once; send() can then be called any
+    number of times. The chat that is already open is reused, and each message
+    is pasted in a single operation instead of being typed key by key.
     """
-    with sync_playwright() as p:
+
+    def __init__(self, session_dir=SESSION_DIR, headless=False):
+        self.session_dir = session_dir
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+        self.page = None
+        self.current_chat = None
+
+    def start(self):
+        self.playwright = sync_playwright().start()
         # Launch browser with persistent context to save login state
         # Added stealth arguments to avoid detection
-        browser = p.chromium.launch_persistent_context(
-            user_data_dir=SESSION_DIR,
-            headless=False, # Must be visible
-            channel="chrome", 
+        self.browser = self.playwright.chromium.launch_persistent_context(
+            user_data_dir=self.session_dir,
+            headless=self.headless,
+            channel="chrome",
             args=[
-                "--start-maximized", 
+                "--start-maximized",
                 "--no-sandbox",
                 "--disable-blink-features=AutomationControlled",
                 "--disable-infobars"
             ],
             viewport=None # Use window size
         )
-        
-        page = browser.pages[0]
-        
-        try:
-            print("Opening WhatsApp Web...")
-            page.goto("https://web.whatsapp.com/", timeout=90000)
-            print(f"Page Title: {page.title()}")
-            
-            # 1. Check for Login
-            try:
-                print("Waiting for WhatsApp to load... (Timeout: 600s / 10 mins)")
-                
-                # Loop to check status so we can print updates
-                start_time = time.time()
-                while time.time() - start_time < 600:
-                    # Success Check: Search box OR Chat List
-                    if (page.locator('div[contenteditable="true"][data-tab="3"]').is_visible() or 
-                        page.locator('div[role="textbox"]').is_visible() or
-                        page.locator('div[aria-label="Chat list"]').is_visible() or
-                        page.locator('div[data-testid="chat-list"]').is_visible()):
-                        print("✅ Logged in!")
-                        break
-                    
-                    if page.locator('text=Loading your chats').is_visible():
-                        print("⏳ Still loading chats... Please wait.")
-                        time.sleep(2)
-                        continue
-                        
-                    if page.locator('canvas[aria-label="Scan this QR code"]').is_visible():
-                         print("👉 PLEASE SCAN THE QR CODE NOW!")
-                         
-                    time.sleep(1)
-                else:
-                    raise TimeoutError("Wait loop exceeded 600s")
-                    
-            except Exception as e:
-                print(f"⚠️ Login/Load Error: {e}")
-                print("Capturing screenshot for debug: login_debug.png")
-                page.screenshot(path="login_debug.png")
-                return
+        self.page = self.browser.pages[0]
+        print("Opening WhatsApp Web...")
+        self.page.goto("https://web.whatsapp.com/", timeout=90000)
+        self.wait_for_login()
 
-            # 2. Search for the Group
-            print(f"Searching for group: '{group_name}'...")
-            
-            # Robust Search Box Location
-            # We look for the search box in the left pane
-            search_box = page.locator('div[contenteditable="true"][data-tab="3"]').first
-            if not search_box.is_visible():
-                # Fallback: look for any textbox in the side pane area (approximate)
-                search_box = page.locator('div[role="textbox"]').first
-            
-            search_box.click()
-            # Clear and type
-            search_box.fill(group_name)
-            time.sleep(1) # Wait for search results
-            search_box.press("Enter")
-            
-            # 3. Verify we opened the chat
-            time.sleep(1)
-            
-            # 4. Type the Message
-            # Main chat input footer
-            # Usually data-tab="10"
-            message_box = page.locator('div[contenteditable="true"][data-tab="10"]')
-            
-            if not message_box.is_visible():
-                 # Fallback
-                 message_box = page.locator('footer div[contenteditable="true"]').first
-            
-            if not message_box.is_visible():
-                print(f"❌ Could not find chat input for '{group_name}'.")
+    def wait_for_login(self, timeout=LOGIN_TIMEOUT_SECONDS):
+        print(f"Waiting for WhatsApp to load... (Timeout: {timeout}s)")
+        # Loop to check status so we can print updates
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            if self.logged_in():
+                print("✅ Logged in!")
                 return
-            
-            print("Typing message...")
-            # We use fill or focus+type. 
-            # Note: WhatsApp handles newlines with Shift+Enter. 
-            # If we just fill, it might submit on Enter or might not handle newlines correctly if passed as one string.
-            # Best practice: split by lines and shift+enter
-            
-            message_box.click()
-            
-            for line in message.split('\n'):
-                message_box.type(line)
-                message_box.press("Shift+Enter")
-            
-            # Remove the last Shift+Enter newline if needed, but usually fine.
-            # Send
-            message_box.press("Enter")
-            print("✅ Message SENT.")
-            
-            # Wait a bit for send to register
-            time.sleep(3)
-            
-        except Exception as e:
-            print(f"Error sending WhatsApp message: {e}")
-            # Save screenshot for debug
-            page.screenshot(path="wa_error.png")
+            if self.page.locator('text=Loading your chats').is_visible():
+                print("⏳ Still loading chats... Please wait.")
+                time.sleep(2)
+                continue
+            if self.page.locator('canvas[aria-label="Scan this QR code"]').is_visible():
+                print("👉 PLEASE SCAN THE QR CODE NOW!")
+            time.sleep(1)
+        print("Capturing screenshot for debug: login_debug.png")
+        self.page.screenshot(path="login_debug.png")
+        raise TimeoutError(f"WhatsApp Web did not load within {timeout}s")
+
+    def logged_in(self):
+        return self.page.locator(LOGGED_IN).first.is_visible()
+
+    def alive(self):
+        """False once the browser window was closed or WhatsApp logged out."""
+        try:
+            return self.page is not None and not self.page.is_closed() and self.logged_in()
+        except Exception:
+            return False
+
+    def open_chat(self, chat_name):
+        if self.current_chat == chat_name:
+            return
+        search_box = self.page.locator(SEARCH_BOX).first
+        search_box.click()
+        search_box.fill(chat_name)
+        # Open the matching result instead of sleeping and hoping the list has settled
+        result = self.page.locator(_title_selector('#pane-side', chat_name)).first
+        result.wait_for(state='visible', timeout=CHAT_OPEN_TIMEOUT_MS)
+        result.click()
+        self.page.locator(_title_selector('#main header', chat_name)).first.wait_for(
+            state='visible', timeout=CHAT_OPEN_TIMEOUT_MS)
+        search_box.fill("")
+        self.current_chat = chat_name
+
+    def send(self, chat_name, message):
+        """Sends `message` to the chat named `chat_name`. Raises on failure."""
+        try:
+            self.open_chat(chat_name)
+        except Exception:
+            self.current_chat = None
+            raise
+        message_box = self.page.locator(MESSAGE_BOX).first
+        if not message_box.is_visible():
+            # Fallback
+            message_box = self.page.locator('footer div[contenteditable="true"]').first
+        message_box.click()
+        self.page.evaluate(PASTE_TEXT, message)
+        if not message_box.inner_text().strip():
+            # Paste was ignored; insert the text in one input event instead
+            self.page.keyboard.insert_text(message)
+        message_box.press("Enter")
+
+    def close(self):
+        try:
+            if self.browser:
+                self.browser.close()
         finally:
-            browser.close()
+            if self.playwright:
+                self.playwright.stop()
+            self.browser = self.page = self.playwright = None
+            self.current_chat = None
+
+
+def send_whatsapp_message(group_name, message):
+    """
+    Sends a message to a specific WhatsApp group using Playwright.
+    This method is robust and does not interfere with the user's mouse/keyboard
+    because it interacts directly with the browser DOM.
+
+    Opens and closes a browser for this one message; to send many, run
+    whatsapp_daemon.py and queue them with enqueue_whatsapp_message().
+    """
+    session = WhatsAppSession()
+    try:
+        session.start()
+        print(f"Sending to '{group_name}'...")
+        session.send(group_name, message)
+        print("✅ Message SENT.")
+        # Wait a bit for send to register
+        time.sleep(3)
+    except Exception as e:
+        print(f"Error sending WhatsApp message: {e}")
+        # Save screenshot for debug
+        if session.page:
+            session.page.screenshot(path="wa_error.png")
+    finally:
+        session.close()
 
 if __name__ == "__main__":
     # Test
     # Replace with your EXACT Group Name
-    TEST_GROUP_NAME = "My Test Group" 
+    TEST_GROUP_NAME = "My Test Group"
     send_whatsapp_message(TEST_GROUP_NAME, "Hello from the new Bot!\nThis message is typed in the background.")
@@ -0,0 +1,165 @@
+import glob
+import json
+import os
+import sys
+import time
+
+WA_SPOOL_DIR = 'wa_outbox'
+WA_POLL_SECONDS = 1.0
+# A message that fails this many times is moved to wa_outbox/failed/
+WA_MAX_ATTEMPTS = 3
+# Pause after each send so WhatsApp registers it before the next chat switch
+WA_SEND_GAP_SECONDS = 1.0
+# After the browser fails to start, wait this long before the next try, doubling per failure in a row
+WA_RESTART_BACKOFF_SECONDS = 30
+WA_RESTART_BACKOFF_MAX_SECONDS = 600
+
+
+def enqueue_whatsapp_message(chat_name, message, spool_dir=WA_SPOOL_DIR):
+    """
+    Queues `message` for the sender daemon and returns immediately. Messages
+    are spool files named by enqueue time, written atomically so the daemon
+    never reads half a file, and are sent in the order they were queued.
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, f"{time.time_ns():020d}-{os.getpid()}.json")
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'chat': chat_name, 'message': message, 'attempts': 0}, f)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+class WhatsAppDaemon:
+    """
+    Resident WhatsApp Web sender. Keeps one logged-in WhatsAppSession open
+    and drains the spool directory that enqueue_whatsapp_message() writes to,
+    so a send costs a chat switch and a paste instead of a browser launch and
+    WhatsApp Web load. Messages survive daemon restarts because they stay in
+    the spool until sent. If the browser dies or WhatsApp logs out, the
+    session is restarted before the next send.
+    """
+
+    def __init__(self, spool_dir=WA_SPOOL_DIR, session=None):
+        self.spool_dir = spool_dir
+        if session is None:
+            from whatsapp_bot import WhatsAppSession
+            session = WhatsAppSession()
+        self.session = session
+        self.started = False
+        self.start_failures = 0
+        self.sent = 0
+        self.failed = 0
+
+    def pending(self):
+        return sorted(glob.glob(os.path.join(self.spool_dir, '*.json')))
+
+    def ensure_session(self):
+        if self.started and self.session.alive():
+            return
+        if self.started:
+            print("WhatsApp session lost, restarting the browser...")
+            self.session.close()
+        self.started = False
+        try:
+            self.session.start()
+        except Exception:
+            # A half-started session still holds the wa_session profile; the next start would find it locked
+            try:
+                self.session.close()
+            except Exception as e:
+                print(f"Error closing the failed WhatsApp session: {e}")
+            self.start_failures += 1
+            delay = min(WA_RESTART_BACKOFF_MAX_SECONDS, WA_RESTART_BACKOFF_SECONDS * 2 ** (self.start_failures - 1))
+            print(f"WhatsApp session failed to start; waiting {delay}s before trying again")
+            time.sleep(delay)
+            raise
+        self.start_failures = 0
+        self.started = True
+
+    def _move_to_failed(self, path):
+        target = os.path.join(self.spool_dir, 'failed', os.path.basename(path))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        self.failed += 1
+        return target
+
+    def load(self, path):
+        """
+        The spool item at `path`, or None if it's gone or can't be sent. An
+        unreadable or corrupt file is moved to failed/ so the messages queued
+        after it still go out.
+        """
+        try:
+            with open(path, 'r') as f:
+                item = json.load(f)
+            if not isinstance(item, dict) or not isinstance(item.get('chat'), str) or not isinstance(item.get('message'), str):
+                raise ValueError("not a spooled message")
+            item.setdefault('attempts', 0)
+            return item
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"❌ Moving unreadable spool file {os.path.basename(path)} to failed/: {e}")
+            try:
+                os.replace(path, self._move_to_failed(path))
+            except OSError as move_error:
+                print(f"❌ Could not move {path}: {move_error}")
+            return None
+
+    def process(self, path):
+        """Sends one spooled message. Returns False if it failed and should be retried later."""
+        item = self.load(path)
+        if item is None:
+            return True
+        started = time.monotonic()
+        try:
+            self.ensure_session()
+            self.session.send(item['chat'], item['message'])
+        except Exception as e:
+            item['attempts'] += 1
+            item['error'] = str(e)
+            print(f"❌ Send to '{item['chat']}' failed (attempt {item['attempts']}): {e}")
+            if item['attempts'] >= WA_MAX_ATTEMPTS:
+                target = self._move_to_failed(path)
+            else:
+                target = path
+            with open(target + '.tmp', 'w') as f:
+                json.dump(item, f)
+            os.replace(target + '.tmp', target)
+            if target != path:
+                os.remove(path)
+            return False
+        os.remove(path)
+        self.sent += 1
+        print(f"✅ Sent to '{item['chat']}' in {time.monotonic() - started:.1f}s")
+        time.sleep(WA_SEND_GAP_SECONDS)
+        return True
+
+    def run_once(self):
+        """Sends everything currently queued. Returns the number of messages sent."""
+        sent = self.sent
+        for path in self.pending():
+            if not self.process(path):
+                break # Keep the queue in order; retry from this message on the next poll
+        return self.sent - sent
+
+    def run(self, poll_seconds=WA_POLL_SECONDS):
+        print(f"WhatsApp sender watching {self.spool_dir}/ (Ctrl+C to stop)")
+        try:
+            while True:
+                if not self.run_once():
+                    time.sleep(poll_seconds)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.session.close()
+            print(f"WhatsApp sender stopped: {self.sent} sent, {self.failed} failed")
+
+
+if __name__ == "__main__":
+    # Usage: python whatsapp_daemon.py              (run the sender)
+    #        python whatsapp_daemon.py GROUP TEXT   (queue one message)
+    sys.stdout.reconfigure(encoding='utf-8')
+    if len(sys.argv) == 3:
+        print(f"Queued {enqueue_whatsapp_message(sys.argv[1], sys.argv[2])}")
+    else:
+        WhatsAppDaemon().run()